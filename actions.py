@@ -20,9 +20,8 @@ Misha Schwartz, and Jaisie Sin
 === Module Description ===
 
 This file contains the different actions that can be made by a Player.
+The keys that the user presses for each action are in controls.py.
 """
-import pygame
-
 # Actions that can be performed in the game
 ROTATE_CLOCKWISE = ('rotate', 1)
 ROTATE_COUNTER_CLOCKWISE = ('rotate', 3)
@@ -65,17 +64,3 @@ ACTION_PENALTY = {
     PAINT: 1,
     PASS: 0
 }
-
-ACTION_KEY = {
-    ROTATE_CLOCKWISE: pygame.K_d,
-    ROTATE_COUNTER_CLOCKWISE: pygame.K_a,
-    SWAP_HORIZONTAL: pygame.K_q,
-    SWAP_VERTICAL: pygame.K_e,
-    SMASH: pygame.K_SPACE,
-    COMBINE: pygame.K_c,
-    PAINT: pygame.K_r,
-    PASS: pygame.K_TAB
-}
-
-# Create a dictionary that is ACTION_KEY inverted
-KEY_ACTION = {value: key for key, value in ACTION_KEY.items()}
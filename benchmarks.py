@@ -0,0 +1,210 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin.
+
+=== Module Description ===
+
+This file contains benchmarks for the Blocky game. Run it to print the
+results of every benchmark.
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple, Union
+import random
+import subprocess
+import sys
+import timeit
+
+from block import Block, generate_board
+from linear_board import LinearBoard
+
+
+class BaselineBlock:
+    """A Block as it was laid out before it had slots, caches or derived
+    positions, kept so that the layout of Block can be compared with it.
+
+    === Public Attributes ===
+    position, size, colour, level, max_depth, children:
+        The same as those of a Block.
+    """
+    position: Tuple[int, int]
+    size: int
+    colour: Optional[Tuple[int, int, int]]
+    level: int
+    max_depth: int
+    children: List[BaselineBlock]
+
+    def __init__(self, position: Tuple[int, int], size: int,
+                 colour: Optional[Tuple[int, int, int]], level: int,
+                 max_depth: int) -> None:
+        """Initialize this block as Block.__init__ does.
+        """
+        self.position = position
+        self.size = size
+        self.colour = colour
+        self.level = level
+        self.max_depth = max_depth
+        self.children = []
+
+    @staticmethod
+    def from_block(block: Block) -> BaselineBlock:
+        """Return a new BaselineBlock with the same attributes and structure
+        as <block>.
+        """
+        baseline = BaselineBlock(block.position, block.size, block.colour,
+                                 block.level, block.max_depth)
+        baseline.children = [BaselineBlock.from_block(child)
+                             for child in block.children]
+        return baseline
+
+    def create_copy(self) -> BaselineBlock:
+        """Return a new BaselineBlock that is a deep copy of this one, as
+        Block.create_copy did.
+        """
+        top_block = BaselineBlock(self.position, self.size, self.colour,
+                                  self.level, self.max_depth)
+        if not self.children:
+            return top_block
+        else:
+            descendents = []
+            for child in self.children:
+                descendents.append(child.create_copy())
+            top_block.children = descendents
+            return top_block
+
+
+def _blocks(block: Union[Block, BaselineBlock]) -> \
+        List[Union[Block, BaselineBlock]]:
+    """Return a list of <block> and all of its descendants.
+    """
+    blocks = [block]
+    for child in block.children:
+        blocks.extend(_blocks(child))
+    return blocks
+
+
+def bytes_per_block(board: Union[Block, BaselineBlock]) -> float:
+    """Return the average number of bytes used by each Block in <board>.
+
+    This counts the Block itself, its instance dictionary (if it has one), its
+    position tuple and its list of children. Colours and small integers are
+    shared between Blocks, so they are not counted. The cached unit cells and
+    hashes are counted separately, by cache_bytes_per_block.
+    """
+    blocks = _blocks(board)
+    total = 0
+    for block in blocks:
+        total += sys.getsizeof(block)
+        if hasattr(block, '__dict__'):
+            total += sys.getsizeof(block.__dict__)
+        total += sys.getsizeof(block.position)
+        total += sys.getsizeof(block.children)
+    return total / len(blocks)
+
+
+def cache_bytes_per_block(board: Block) -> float:
+    """Return the average number of bytes used by the cached unit cells and
+    structural hashes of each Block in <board>.
+
+    This counts each cached tuple of columns, the column tuples in it, and
+    each cached tuple of hashes and the integers in it. The colours in the
+    columns are shared, so they are not counted.
+    """
+    blocks = _blocks(board)
+    total = 0
+    for block in blocks:
+        if block._cells is not None:
+            total += sys.getsizeof(block._cells)
+            total += sum(sys.getsizeof(column) for column in block._cells)
+        if block._hashes is not None:
+            total += sys.getsizeof(block._hashes)
+            total += sum(sys.getsizeof(key) for key in block._hashes)
+    return total / len(blocks)
+
+
+def benchmark_block_layout(max_depth: int = 6) -> None:
+    """Print the memory used by each Block of a random board with a depth of
+    <max_depth>, and the time taken to copy, rotate and swap it.
+
+    The memory used and the time taken to copy the same board laid out as a
+    BaselineBlock are printed alongside, for comparison.
+    """
+    random.seed(148)
+    board = generate_board(max_depth, 750)
+    baseline = BaselineBlock.from_block(board)
+    print(f'Block layout (max_depth={max_depth}, '
+          f'{len(_blocks(board))} blocks)')
+    cached = board.create_copy()
+    width = 2 ** max_depth
+    cached.flatten_into([[None] * width for _ in range(width)])
+    cached.structural_hash()
+    layout = bytes_per_block(board)
+    cache = cache_bytes_per_block(cached)
+    print(f'  bytes per block: {layout:.1f} '
+          f'(baseline {bytes_per_block(baseline):.1f})')
+    print(f'  cache bytes per block, once flattened and hashed: {cache:.1f} '
+          f'(total {layout + cache:.1f})')
+    for name, statement in [('create_copy', board.create_copy),
+                            ('baseline create_copy', baseline.create_copy),
+                            ('rotate', lambda: board.rotate(1)),
+                            ('swap', lambda: board.swap(1))]:
+        seconds = min(timeit.repeat(statement, number=20, repeat=5)) / 20
+        print(f'  {name}: {seconds * 1e6:.0f} us')
+
+
+def benchmark_linear_board(max_depth: int = 6) -> None:
+    """Print the time taken to copy a random board with a depth of
+    <max_depth> as a Block and as a LinearBoard.
+    """
+    random.seed(148)
+    board = generate_board(max_depth, 750)
+    linear = LinearBoard.from_block(board)
+    print(f'Linear board (max_depth={max_depth}, {len(linear)} nodes)')
+    for name, statement in [('Block.create_copy', board.create_copy),
+                            ('LinearBoard.copy', linear.copy)]:
+        seconds = min(timeit.repeat(statement, number=20, repeat=5)) / 20
+        print(f'  {name}: {seconds * 1e6:.1f} us')
+
+
+def benchmark_startup(modules: Tuple[str, ...] = ('engine', 'player', 'game'),
+                      repeat: int = 5) -> None:
+    """Print the time taken by a new Python process to import each module in
+    <modules>, as the fastest of <repeat> runs, and whether it loaded pygame.
+
+    The time of a process that imports nothing is printed first, for
+    comparison.
+    """
+    print('Startup')
+    for module in ('',) + modules:
+        statement = (f'import {module}; ' if module else '') + \
+            "import sys; print('pygame' in sys.modules)"
+        seconds = float('inf')
+        for _ in range(repeat):
+            start = timeit.default_timer()
+            output = subprocess.run([sys.executable, '-c', statement],
+                                    capture_output=True, text=True,
+                                    check=True).stdout
+            seconds = min(seconds, timeit.default_timer() - start)
+        pygame = ', loads pygame' if output.split()[-1] == 'True' else ''
+        print(f'  import {module or "nothing"}: {seconds * 1e3:.0f} ms'
+              f'{pygame}')
+
+
+if __name__ == '__main__':
+    benchmark_block_layout()
+    benchmark_linear_board()
+    benchmark_startup()
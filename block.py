@@ -22,11 +22,38 @@ Misha Schwartz, and Jaisie Sin
 This file contains the Block class, the main data structure used in the game.
 """
 from __future__ import annotations
-from typing import Optional, Tuple, List
+from bisect import bisect_right
+from typing import Any, Dict, Optional, Sequence, Tuple, List, Union, \
+    TYPE_CHECKING
 import random
 import math
 
-from settings import colour_name, COLOUR_LIST
+from settings import colour_name, colour_index, COLOUR_LIST
+
+# NumPy is optional, and only Block.to_grid needs it. It is imported there
+# rather than here, since importing it takes longer than the rest of the game.
+if TYPE_CHECKING:
+    import numpy as np
+
+# The structural hash of a Block is a 64-bit integer. As in Zobrist hashing,
+# each leaf is given a random key for its level and colour, drawn from a fixed
+# seed so that every process agrees on them, and each child slot has a random
+# odd multiplier that spreads its child's hash before they are combined.
+_HASH_MASK = (1 << 64) - 1
+_HASH_KEYS = random.Random(148)
+_LEAF_KEYS = {(level, colour): _HASH_KEYS.getrandbits(64)
+              for level in range(32) for colour in COLOUR_LIST}
+_SLOT_KEYS = tuple(_HASH_KEYS.getrandbits(64) | 1 for _ in range(4))
+del _HASH_KEYS
+
+# A Block caches its unit cells only if it is at least _CACHE_DEPTH levels
+# above max_depth, and its structural hashes only if it is at least
+# _HASH_DEPTH levels above it. The Blocks below that are most of a board, but
+# each covers only a few cells, so recomputing them is cheap while caching
+# them would cost more memory than the rest of the board. Hashes are smaller
+# than unit cells, so they are cached one level further down.
+_CACHE_DEPTH = 4
+_HASH_DEPTH = 3
 
 
 def generate_board(max_depth: int, size: int) -> Block:
@@ -47,6 +74,45 @@ def generate_board(max_depth: int, size: int) -> Block:
     return board
 
 
+def _majority_colour(children: Sequence[Union[Block, PersistentBlock]]) -> \
+        Optional[Tuple[int, int, int]]:
+    """Return the colour shared by more of <children> than any other colour,
+    or None if there is no such colour.
+    """
+    majority = None
+    most = 0
+    for child in children:
+        count = 0
+        for other in children:
+            if other.colour == child.colour:
+                count += 1
+        if count > most:
+            majority = child.colour
+            most = count
+        elif count == most and child.colour != majority:
+            majority = None
+    return majority
+
+
+def _leaf_hash(level: int, colour: Tuple[int, int, int]) -> int:
+    """Return the structural hash of a leaf at <level> with <colour>.
+    """
+    key = _LEAF_KEYS.get((level, colour))
+    if key is None:
+        key = hash((level, colour)) & _HASH_MASK
+    return key
+
+
+def _combine_hashes(hashes: Sequence[int]) -> int:
+    """Return the structural hash of a Block whose four children, in order,
+    have the structural hashes <hashes>.
+    """
+    result = 0
+    for slot in range(4):
+        result ^= (hashes[slot] * _SLOT_KEYS[slot]) & _HASH_MASK
+    return result ^ (result >> 29)
+
+
 class Block:
     """A square Block in the Blocky game, represented as a tree.
 
@@ -59,6 +125,14 @@ class Block:
     child's position. Indices 0, 1, 2, and 3 are the upper-right child,
     upper-left child, lower-left child, and lower-right child, respectively.
 
+    A Block is mutable, but it is hashable: its hash is its structural hash,
+    which changes whenever the Block or one of its descendants changes. So a
+    Block must not be kept in a set, or as a key of a dict, across a change to
+    it, since it would no longer be found there. Key such collections by the
+    structural hash taken before the change instead. Comparing or hashing
+    Blocks fills their caches of structural hashes and links their
+    descendants to their parents, but neither changes the Blocks otherwise.
+
     === Public Attributes ===
     position:
         The (x, y) coordinates of the upper left corner of this Block.
@@ -91,13 +165,72 @@ class Block:
     - If this Block has no children:
         - its colour is not None.
     - level <= max_depth
+
+    === Private Attributes ===
+    _parent:
+        The Block that has this Block as one of its children, or None if this
+        Block is the root or has not been linked to its parent yet.
+    _position:
+        The position given to this Block when it was created or last
+        assigned. Once this Block is linked to its parent, it instead caches
+        the position derived from its parent.
+    _stamp:
+        The value of Block._generation when <_position> was derived from
+        this Block's parent, or -1 if it has not been derived.
+    _children:
+        The children of this Block before the pending rotation <_turn> is
+        applied to them.
+    _turn:
+        The number of clockwise quarter turns that this Block and its
+        descendants have been rotated by, but that have not yet been applied
+        to <_children>. It is applied the next time <children> is read.
+    _hashes:
+        A cache of the structural hashes of this Block with <_children>
+        rotated clockwise by 0, 1, 2 and 3 quarter turns, or None if they
+        have not been computed since this Block or one of its descendants
+        last changed. Only Blocks that are at least _HASH_DEPTH levels
+        above max_depth cache their hashes.
+    _colour:
+        The colour of this Block, or None if it has children.
+    _cells:
+        A cache of the unit cells of this Block, stored column by column as
+        a tuple of tuples of colours, or None if it has not been computed
+        since this Block or one of its descendants last changed. Only Blocks
+        that are at least _CACHE_DEPTH levels above max_depth cache their
+        unit cells.
+
+    === Representation Invariants concerning the private attributes ===
+    - If this Block's <_cells> is not None, then so is the <_cells> of each of
+      its descendants that caches them, and each of its descendants is
+      linked to its parent.
+    - If this Block's <_hashes> is not None, then so is the <_hashes> of each
+      of its descendants that caches them, and each of its descendants is
+      linked to its parent.
+    - 0 <= _turn < 4, and if _turn != 0 then <_cells> is None and this Block
+      has children.
     """
-    position: Tuple[int, int]
+    # A board holds thousands of Blocks, so they use slots instead of an
+    # instance dictionary.
+    __slots__ = ('_position', 'size', '_colour', 'level', 'max_depth',
+                 '_children', '_parent', '_cells', '_hashes', '_stamp',
+                 '_turn')
+
+    # Incremented whenever a move changes where Blocks are. A derived
+    # position is reused only while the generation it was derived in is
+    # current, so a swap or rotate never has to rewrite its descendants.
+    _generation = 0
+
     size: int
-    colour: Optional[Tuple[int, int, int]]
     level: int
     max_depth: int
-    children: List[Block]
+    _colour: Optional[Tuple[int, int, int]]
+    _parent: Optional[Block]
+    _cells: Optional[Tuple[Tuple[Tuple[int, int, int], ...], ...]]
+    _hashes: Optional[Tuple[int, int, int, int]]
+    _position: Tuple[int, int]
+    _stamp: int
+    _children: List[Block]
+    _turn: int
 
     def __init__(self, position: Tuple[int, int], size: int,
                  colour: Optional[Tuple[int, int, int]], level: int,
@@ -111,12 +244,131 @@ class Block:
             - level >= 0
             - max_depth >= level
         """
-        self.position = position
+        self._position = position
+        self._stamp = -1
         self.size = size
-        self.colour = colour
+        self._colour = colour
         self.level = level
         self.max_depth = max_depth
-        self.children = []
+        self._children = []
+        self._turn = 0
+        self._parent = None
+        self._cells = None
+        self._hashes = None
+
+    @property
+    def children(self) -> List[Block]:
+        """The blocks into which this block is subdivided.
+
+        A rotation only records a pending turn on the rotated Block. Reading
+        <children> applies that turn: the children are reordered in place,
+        and the turn is passed down to each child that has children of its
+        own, so each level is reordered only when something reads it.
+        """
+        if self._turn:
+            self._apply_turn()
+        return self._children
+
+    @children.setter
+    def children(self, children: List[Block]) -> None:
+        """Set the children of this Block to <children>, link each of them to
+        this Block, and discard the cached unit cells and hashes that
+        included its old children.
+
+        Blocks may be appended to a newly assigned list, but any other change
+        to the list itself must be made by assigning a new list.
+        """
+        self._children = children
+        self._turn = 0
+        for child in children:
+            child._parent = self
+            child._stamp = -1
+        self._invalidate()
+
+    @property
+    def colour(self) -> Optional[Tuple[int, int, int]]:
+        """The colour of this Block, or None if it has children.
+        """
+        return self._colour
+
+    @colour.setter
+    def colour(self, colour: Optional[Tuple[int, int, int]]) -> None:
+        """Set the colour of this Block to <colour>, and discard the cached
+        unit cells and hashes that included its old colour.
+        """
+        self._colour = colour
+        self._invalidate()
+
+    def _apply_turn(self) -> None:
+        """Reorder the children of this Block by its pending turn, and pass the
+        turn down to each child that has children of its own.
+        """
+        turn = self._turn
+        self._turn = 0
+        children = self._children
+        children[:] = children[turn:] + children[:turn]
+        if self._hashes is not None:
+            self._hashes = self._hashes[turn:] + self._hashes[:turn]
+        for child in children:
+            if child._children:
+                child._turn = (child._turn + turn) % 4
+                child._cells = None
+
+    def _settle(self) -> None:
+        """Apply the pending turns of the ancestors of this Block, from the
+        root down, so that this Block's children are in their current order.
+
+        A swap, smash or combine must see its children in that order, since
+        unlike a rotation it does not commute with its ancestors' rotations.
+        """
+        ancestors = []
+        block = self._parent
+        while block is not None:
+            ancestors.append(block)
+            block = block._parent
+        for block in reversed(ancestors):
+            if block._turn:
+                block._apply_turn()
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """The (x, y) coordinates of the upper left corner of this Block.
+
+        The position of a Block that is linked to its parent is derived from
+        its parent's position and its index among its parent's children, and
+        is cached until the next move that changes where Blocks are.
+        """
+        parent = self._parent
+        if parent is None or self._stamp == Block._generation:
+            return self._position
+        x, y = parent.position
+        size = parent._child_size()
+        children = parent.children
+        if children[0] is self:
+            position = (x + size, y)
+        elif children[1] is self:
+            position = (x, y)
+        elif children[2] is self:
+            position = (x, y + size)
+        elif children[3] is self:
+            position = (x + size, y + size)
+        else:
+            # This Block has been removed from its parent.
+            return self._position
+        self._position = position
+        self._stamp = Block._generation
+        return position
+
+    @position.setter
+    def position(self, position: Tuple[int, int]) -> None:
+        """Set the position of this Block to <position>.
+
+        The positions of its descendants follow it. If this Block is linked to
+        its parent, its position is still derived from its parent's.
+        """
+        self._position = position
+        self._stamp = -1
+        Block._generation += 1
 
     def __str__(self) -> str:
         """Return this Block in a string format.
@@ -141,7 +393,12 @@ class Block:
     def __eq__(self, other: Block) -> bool:
         """Return True iff this Block and all its descendents are equivalent to
         the <other> Block and all its descendents.
+
+        Blocks with different structural hashes are rejected without walking
+        their descendants.
         """
+        if self.structural_hash() != other.structural_hash():
+            return False
         if len(self.children) == 0 and len(other.children) == 0:
             # Both self and other are leaves.
             return self.position == other.position and \
@@ -161,6 +418,53 @@ class Block:
 
             return True
 
+    def __hash__(self) -> int:
+        """Return the structural hash of this Block.
+
+        The hash changes whenever this Block changes, so a Block must not be
+        used as a key of a dict or set across a change to it.
+        """
+        return self.structural_hash()
+
+    def structural_hash(self) -> int:
+        """Return a 64-bit hash of the colours and structure of this Block and
+        its descendants.
+
+        Equal Blocks have equal hashes, whatever their history. The hashes of
+        the descendants are cached, so after a move only the hashes of the
+        moved Block and its ancestors are recomputed.
+
+        >>> block = generate_board(2, 750)
+        >>> block.structural_hash() == block.create_copy().structural_hash()
+        True
+        """
+        return self._orientation_hashes()[0]
+
+    def _orientation_hashes(self) -> Tuple[int, int, int, int]:
+        """Return the structural hashes of this Block rotated clockwise by 0,
+        1, 2 and 3 quarter turns.
+        """
+        children = self._children
+        if not children:
+            key = _leaf_hash(self.level, self._colour)
+            return key, key, key, key
+        hashes = self._hashes
+        if hashes is None:
+            # Link the children first, so that a later change to any of them
+            # discards this cache.
+            for child in children:
+                if child._parent is not self:
+                    child._parent = self
+                    child._stamp = -1
+            rotated = [child._orientation_hashes() for child in children]
+            hashes = tuple(_combine_hashes([rotated[(i + turn) % 4][turn]
+                                            for i in range(4)])
+                           for turn in range(4))
+            if self.max_depth - self.level >= _HASH_DEPTH:
+                self._hashes = hashes
+        turn = self._turn
+        return hashes[turn:] + hashes[:turn]
+
     def _child_size(self) -> int:
         """Return the size of this Block's children.
         """
@@ -183,17 +487,106 @@ class Block:
         descendants to have positions consistent with this Block's.
 
         <position> is the (x, y) coordinates of the upper-left corner of this
-        Block.
+        Block. Descendants derive their positions lazily, so this takes
+        constant time.
         """
-        x = position[0]
-        y = position[1]
+        self._link()
         self.position = position
-        if self.children:
-            size = self._child_size()
-            self.children[0]._update_children_positions((x + size, y))
-            self.children[1]._update_children_positions((x, y))
-            self.children[2]._update_children_positions((x, y + size))
-            self.children[3]._update_children_positions((x + size, y + size))
+
+    def _link(self) -> None:
+        """Link each descendant of this Block to its parent, so that its
+        position can be derived from its parent's.
+
+        Children that are already linked to this Block are skipped, since
+        their descendants are linked too.
+        """
+        for child in self.children:
+            if child._parent is not self:
+                child._parent = self
+                child._link()
+
+    def _invalidate(self) -> None:
+        """Discard the cached unit cells and structural hashes of this Block
+        and of every ancestor whose caches include this Block.
+
+        Ancestors too close to max_depth to cache both are passed over.
+        Above them, the first ancestor with no caches ends the walk, since
+        none of its own ancestors can have caches either.
+        """
+        self._cells = None
+        self._hashes = None
+        block = self._parent
+        while block is not None and (
+                block.max_depth - block.level <
+                max(_CACHE_DEPTH, _HASH_DEPTH) or
+                block._cells is not None or block._hashes is not None):
+            block._cells = None
+            block._hashes = None
+            block = block._parent
+
+    def flatten_into(self, grid: List[List[Optional[Tuple[int, int, int]]]],
+                     x: int = 0, y: int = 0) -> None:
+        """Write the unit cells of this Block into <grid> so that its upper
+        left unit cell is at grid[x][y].
+
+        <grid> is indexed by column and then by row, and must have room for
+        the 2^(max_depth - level) by 2^(max_depth - level) unit cells of this
+        Block. Each Block is visited at most once, and a Block whose cells are
+        cached is copied over without visiting its descendants.
+        """
+        width = 2 ** (self.max_depth - self.level)
+        if self._cells is not None:
+            for i in range(width):
+                grid[x + i][y:y + width] = self._cells[i]
+        elif not self.children:
+            column = [self._colour] * width
+            for i in range(x, x + width):
+                grid[i][y:y + width] = column
+        else:
+            half = width // 2
+            for child in self.children:
+                child._parent = self
+            self.children[0].flatten_into(grid, x + half, y)
+            self.children[1].flatten_into(grid, x, y)
+            self.children[2].flatten_into(grid, x, y + half)
+            self.children[3].flatten_into(grid, x + half, y + half)
+            if self.max_depth - self.level >= _CACHE_DEPTH:
+                self._cells = tuple(tuple(grid[i][y:y + width])
+                                    for i in range(x, x + width))
+
+    def to_grid(self) -> np.ndarray:
+        """Return a NumPy array of the palette indices of this Block's unit
+        cells.
+
+        The array has dtype uint8 and shape (2^(max_depth - level),
+        2^(max_depth - level)), and is indexed by column and then by row like
+        the unit cells written by flatten_into. Each entry is the index in
+        COLOUR_LIST of the colour of that unit cell.
+
+        Precondition:
+            - NumPy is installed
+            - The colour of every leaf in this Block is in COLOUR_LIST
+        """
+        import numpy as np
+
+        width = 2 ** (self.max_depth - self.level)
+        grid = np.empty((width, width), dtype=np.uint8)
+        self._fill_grid(grid, 0, 0, width)
+        return grid
+
+    def _fill_grid(self, grid: np.ndarray, x: int, y: int, width: int) -> None:
+        """Write the palette indices of this Block's unit cells into the
+        <width> by <width> region of <grid> whose upper left cell is at
+        grid[x, y].
+        """
+        if not self.children:
+            grid[x:x + width, y:y + width] = colour_index(self.colour)
+        else:
+            half = width // 2
+            self.children[0]._fill_grid(grid, x + half, y, half)
+            self.children[1]._fill_grid(grid, x, y, half)
+            self.children[2]._fill_grid(grid, x, y + half, half)
+            self.children[3]._fill_grid(grid, x + half, y + half, half)
 
     def smashable(self) -> bool:
         """Return True iff this block can be smashed.
@@ -203,6 +596,37 @@ class Block:
         """
         return self.level != self.max_depth and len(self.children) == 0
 
+    def can_swap(self) -> bool:
+        """Return True iff this block can be swapped, which is iff it has
+        children.
+        """
+        return len(self.children) != 0
+
+    def can_rotate(self) -> bool:
+        """Return True iff this block can be rotated, which is iff it has
+        children.
+        """
+        return len(self.children) != 0
+
+    def can_paint(self, colour: Tuple[int, int, int]) -> bool:
+        """Return True iff this block can be painted <colour>.
+
+        A block can be painted if it is a leaf at a level of max_depth and its
+        colour is different from <colour>.
+        """
+        return not self.children and self.level == self.max_depth and \
+            self.colour != colour
+
+    def can_combine(self) -> bool:
+        """Return True iff this block can be combined.
+
+        A block can be combined if it is at a level of max_depth - 1, it has
+        children, and its children have a majority colour.
+        """
+        return self.level == self.max_depth - 1 and \
+            len(self.children) != 0 and \
+            _majority_colour(self.children) is not None
+
     def smash(self) -> bool:
         """Sub-divide this block so that it has four randomly generated
         children.
@@ -214,16 +638,22 @@ class Block:
         """
         if not self.smashable():
             return False
+        self._settle()
+        self._invalidate()
+        self.colour = None
+        positions = self._children_positions()
+        size = self._child_size()
+        level = self.level + 1
+        smash_chance = math.exp(-0.25 * self.level)
         for i in range(4):
             colour_randint = random.randint(0, len(COLOUR_LIST) - 1)
-            self.colour = None
-            self.children.append(Block(self._children_positions()[i],
-                                       self._child_size(),
-                                       COLOUR_LIST[colour_randint],
-                                       self.level + 1, self.max_depth))
+            child = Block(positions[i], size, COLOUR_LIST[colour_randint],
+                          level, self.max_depth)
+            child._parent = self
+            self.children.append(child)
             rand = random.random()
-            if rand < math.exp(-0.25 * self.level):
-                self.children[i].smash()
+            if rand < smash_chance:
+                child.smash()
         return True
 
     def swap(self, direction: int) -> bool:
@@ -236,8 +666,9 @@ class Block:
 
         Precondition: <direction> is either 0 or 1
         """
-        if not self.children:
+        if not self.can_swap():
             return False
+        self._settle()
         if direction == 1:
             self.children[0], self.children[3] = self.children[3], \
                                                  self.children[0]
@@ -248,7 +679,9 @@ class Block:
                                                  self.children[0]
             self.children[2], self.children[3] = self.children[3], \
                                                  self.children[2]
-        self._update_children_positions(self.position)
+        self._link()
+        Block._generation += 1
+        self._invalidate()
         return True
 
     def rotate(self, direction: int) -> bool:
@@ -257,23 +690,20 @@ class Block:
         If this Block has no children, do nothing. If <direction> is 1, rotate
         clockwise. If <direction> is 3, rotate counter-clockwise.
 
+        The rotation takes constant time: it is recorded as a pending turn,
+        which is applied to each level of descendants when that level is next
+        read through <children>.
+
         Return True iff the rotate was performed.
 
         Precondition: <direction> is either 1 or 3.
         """
-        if not self.children:
+        if not self.can_rotate():
             return False
-        if direction == 1:
-            self.children[0], self.children[1], self.children[2], \
-            self.children[3] = self.children[1], self.children[2], \
-                               self.children[3], self.children[0]
-        else:
-            self.children[0], self.children[1], self.children[2], \
-            self.children[3] = self.children[3], self.children[0], \
-                               self.children[1], self.children[2]
-        self._update_children_positions(self.position)
-        for child in self.children:
-            child.rotate(direction)
+        self._invalidate()
+        self._link()
+        self._turn = (self._turn + direction) % 4
+        Block._generation += 1
         return True
 
     def paint(self, colour: Tuple[int, int, int]) -> bool:
@@ -282,9 +712,9 @@ class Block:
 
         Return True iff this Block's colour was changed.
         """
-        if (not self.children) and self.level == self.max_depth and \
-                self.colour != colour:
+        if self.can_paint(colour):
             self.colour = colour
+            self._invalidate()
             return True
         return False
 
@@ -301,35 +731,385 @@ class Block:
 
         Return True iff this Block was turned into a leaf node.
         """
-        if self.level != self.max_depth - 1 or not self.children:
+        if not self.can_combine():
             return False
-        colours = []
-        acc = []
-        for child in self.children:
-            colours.append(child.colour)
-        for colour in colours:
-            acc.append(colours.count(colour))
-        if 3 in acc or 4 in acc or acc.count(2) == 2:
+        self._settle()
+        self.colour = _majority_colour(self.children)
+        self.children = []
+        self._invalidate()
+        return True
+
+    def perform(self, action: Tuple[str, Optional[int]],
+                colour: Tuple[int, int, int],
+                log: Optional[List[Tuple[Block, str, Any]]] = None) -> bool:
+        """Perform <action> on this Block, using <colour> if <action> is a
+        paint, and return True iff it was performed.
+
+        <action> is one of the actions in the actions module, such as
+        ('rotate', 1) or ('pass', None). If <log> is given and <action> is
+        performed, a record of what changed is appended to <log> so that the
+        move can be reverted with undo_move.
+        """
+        name, direction = action
+        if name == 'rotate':
+            performed = self.rotate(direction)
+            record = direction
+        elif name == 'swap':
+            performed = self.swap(direction)
+            record = direction
+        elif name == 'smash':
+            record = self.colour
+            performed = self.smash()
+        elif name == 'paint':
+            record = self.colour
+            performed = self.paint(colour)
+        elif name == 'combine':
+            record = self.children
+            performed = self.combine()
+        else:
+            performed = name == 'pass'
+            record = None
+        if performed and log is not None:
+            log.append((self, name, record))
+        return performed
+
+    def revert(self, name: str, record: Any) -> None:
+        """Revert the move named <name> that Block.perform recorded as
+        <record> when it was performed on this Block.
+
+        Rotations and swaps are reverted by their inverse move, a paint
+        restores the old colour, a combine restores the removed children, and
+        a smash discards the children it created.
+
+        Precondition: this Block has not changed since that move, other than
+        by moves that have already been reverted.
+        """
+        if name == 'rotate':
+            self.rotate(4 - record)
+        elif name == 'swap':
+            self.swap(record)
+        elif name == 'paint':
+            self.paint(record)
+        elif name == 'combine':
+            self._settle()
+            self.colour = None
+            self.children = record
+            self._invalidate()
+        elif name == 'smash':
+            self.colour = record
             self.children = []
-            self.colour = colours[acc.index(max(acc))]
-            return True
-        return False
+            self._invalidate()
 
     def create_copy(self) -> Block:
         """Return a new Block that is a deep copy of this Block.
 
         Remember that a deep copy has new blocks (not aliases) at every level.
+        The cached unit cells and structural hashes are immutable, so the copy
+        shares them.
         """
-        top_block = Block(self.position, self.size, self.colour, self.level,
-                          self.max_depth)
-        if not self.children:
-            return top_block
+        return self._copy(self.position)
+
+    def _copy(self, position: Tuple[int, int]) -> Block:
+        """Return a new Block at <position> that is a deep copy of this Block,
+        with each of its descendants linked to its parent.
+
+        The copy is made from the private attributes as they are, so a pending
+        rotation is copied rather than applied, and the caches are shared.
+        """
+        copy = Block(position, self.size, self._colour, self.level,
+                     self.max_depth)
+        if self._children:
+            children = [child._copy(child._position)
+                        for child in self._children]
+            for child in children:
+                child._parent = copy
+            copy._children = children
+            copy._turn = self._turn
+            copy._cells = self._cells
+            copy._hashes = self._hashes
+        return copy
+
+
+def undo_move(log: List[Tuple[Block, str, Any]]) -> Block:
+    """Revert the most recent move recorded in <log> by Block.perform, remove
+    its record from <log>, and return the Block the move was performed on.
+
+    Precondition: every move recorded after that one has been reverted.
+    """
+    block, name, record = log.pop()
+    block.revert(name, record)
+    return block
+
+
+# For each child of a Block, the column and row of its cell within the two by
+# two cells that its parent's cell divides into.
+_CHILD_CELLS = ((1, 0), (0, 0), (0, 1), (1, 1))
+
+
+class BlockIndex:
+    """An index from the level and cell of each Block of a board to the Block,
+    for answering which Block is at a location.
+
+    The Blocks at a level of the board divide it into a grid of cells, and a
+    Block's cell is its column and row in the grid of its level. The index is
+    rebuilt lazily: a query first checks whether the board has been moved
+    since the index was built, and rebuilds it only then.
+
+    === Public Attributes ===
+    board:
+        The board that is indexed.
+
+    === Private Attributes ===
+    _blocks:
+        The Block at each (level, column, row) of the board.
+    _starts:
+        For each number of levels below the board, the distance from the
+        board's left or upper edge to the start of each column or row of the
+        grid at that level.
+    _ends:
+        Like <_starts>, the distance to the end of each column or row, where
+        it is cut short by the end of a column or row above it. Rounding can
+        leave a gap between a child and the edge of its parent, which belongs
+        to neither.
+    _stamp:
+        The value of Block._generation and the structural hash of the board
+        when the index was built, or None if it has not been built.
+    """
+    board: Block
+    _blocks: Dict[Tuple[int, int, int], Block]
+    _starts: List[List[int]]
+    _ends: List[List[int]]
+    _stamp: Optional[Tuple[int, int]]
+
+    def __init__(self, board: Block) -> None:
+        """Initialize an index of <board>, which is built when it is first
+        queried.
+        """
+        self.board = board
+        self._blocks = {}
+        self._starts = []
+        self._ends = []
+        self._stamp = None
+
+    def block_at(self, location: Tuple[int, int], level: int) -> \
+            Optional[Block]:
+        """Return the Block of the board that is at <level> and includes
+        <location>, as player._get_block does.
+
+        If <level> is greater than the level of the deepest Block that
+        includes <location>, return that deepest Block. If no Block includes
+        <location>, return None.
+        """
+        board = self.board
+        x, y = board.position
+        if not (x <= location[0] < x + board.size and
+                y <= location[1] < y + board.size) or level < board.level:
+            return None
+        stamp = (Block._generation, board.structural_hash())
+        if stamp != self._stamp:
+            self._rebuild()
+            self._stamp = stamp
+        level = min(level, board.max_depth)
+        starts = self._starts[level - board.level]
+        column = bisect_right(starts, location[0] - x) - 1
+        row = bisect_right(starts, location[1] - y) - 1
+        while (level, column, row) not in self._blocks:
+            level -= 1
+            column //= 2
+            row //= 2
+        ends = self._ends[level - board.level]
+        if location[0] - x >= ends[column] or location[1] - y >= ends[row]:
+            return None
+        return self._blocks[level, column, row]
+
+    def _rebuild(self) -> None:
+        """Rebuild this index from the current Blocks of the board.
+        """
+        board = self.board
+        if not self._starts:
+            starts = [0]
+            ends = [board.size]
+            size = board.size
+            self._starts.append(starts)
+            self._ends.append(ends)
+            for _ in range(board.max_depth - board.level):
+                size = round(size / 2.0)
+                starts = [start + offset for start in starts
+                          for offset in (0, size)]
+                ends = [min(start + size, ends[i // 2])
+                        for i, start in enumerate(starts)]
+                self._starts.append(starts)
+                self._ends.append(ends)
+        self._blocks = {}
+        stack = [(board, 0, 0)]
+        while stack:
+            block, column, row = stack.pop()
+            self._blocks[block.level, column, row] = block
+            for i, child in enumerate(block.children):
+                stack.append((child, 2 * column + _CHILD_CELLS[i][0],
+                              2 * row + _CHILD_CELLS[i][1]))
+
+
+class PersistentBlock:
+    """An immutable square Block in the Blocky game, represented as a tree.
+
+    A PersistentBlock is never changed once it is created. Instead, each move
+    returns a new root that shares every subtree the move did not touch, so
+    keeping many versions of a board alive costs memory proportional to the
+    moves made rather than to the size of the board.
+
+    A PersistentBlock has no position or size; those are given when it is
+    turned back into a Block with to_block.
+
+    === Public Attributes ===
+    colour:
+        If this block is not subdivided, <colour> stores its colour. Otherwise,
+        <colour> is None.
+    level:
+        The level of this block within the overall block structure.
+    max_depth:
+        The deepest level allowed in the overall block structure.
+    children:
+        The blocks into which this block is subdivided, in the same order as
+        the children of a Block.
+
+    === Representation Invariants===
+    - The same as those of Block, where they do not concern position or size.
+    """
+    __slots__ = ('colour', 'level', 'max_depth', 'children')
+    colour: Optional[Tuple[int, int, int]]
+    level: int
+    max_depth: int
+    children: Tuple[PersistentBlock, ...]
+
+    def __init__(self, colour: Optional[Tuple[int, int, int]], level: int,
+                 max_depth: int,
+                 children: Tuple[PersistentBlock, ...] = ()) -> None:
+        """Initialize this block with the given <colour>, at <level>, and with
+        the given <children>.
+
+        Preconditions:
+            - level >= 0
+            - max_depth >= level
+        """
+        self.colour = colour
+        self.level = level
+        self.max_depth = max_depth
+        self.children = children
+
+    def __eq__(self, other: PersistentBlock) -> bool:
+        """Return True iff this PersistentBlock and all its descendants are
+        equivalent to the <other> PersistentBlock and all its descendants.
+        """
+        if self is other:
+            return True
+        return self.colour == other.colour and self.level == other.level \
+            and self.max_depth == other.max_depth \
+            and self.children == other.children
+
+    @staticmethod
+    def from_block(block: Block) -> PersistentBlock:
+        """Return a PersistentBlock with the same colours and structure as
+        <block>.
+        """
+        return PersistentBlock(block.colour, block.level, block.max_depth,
+                               tuple(PersistentBlock.from_block(child)
+                                     for child in block.children))
+
+    def to_block(self, position: Tuple[int, int], size: int) -> Block:
+        """Return a new Block with the same colours and structure as this
+        PersistentBlock, whose upper left corner is at <position> and whose
+        dimensions are <size> by <size>.
+        """
+        block = Block(position, size, self.colour, self.level, self.max_depth)
+        if self.children:
+            positions = block._children_positions()
+            child_size = block._child_size()
+            for i in range(4):
+                child = self.children[i].to_block(positions[i], child_size)
+                child._parent = block
+                block.children.append(child)
+        return block
+
+    def descendant(self, path: Sequence[int]) -> PersistentBlock:
+        """Return the descendant of this PersistentBlock reached by following
+        the child indices in <path>, starting from this PersistentBlock.
+        """
+        block = self
+        for i in path:
+            block = block.children[i]
+        return block
+
+    def perform(self, path: Sequence[int], action: Tuple[str, Optional[int]],
+                colour: Tuple[int, int, int]) -> Optional[PersistentBlock]:
+        """Return a new root with <action> performed on the descendant at
+        <path>, using <colour> if <action> is a paint, or None if the action
+        cannot be performed there.
+
+        The new root shares every subtree that is neither the descendant at
+        <path>, nor one of its ancestors, nor (for a rotation) one of its
+        descendants.
+        """
+        if not path:
+            return self._moved(action, colour)
+        child = self.children[path[0]].perform(path[1:], action, colour)
+        if child is None:
+            return None
+        children = list(self.children)
+        children[path[0]] = child
+        return PersistentBlock(None, self.level, self.max_depth,
+                               tuple(children))
+
+    def _moved(self, action: Tuple[str, Optional[int]],
+               colour: Tuple[int, int, int]) -> Optional[PersistentBlock]:
+        """Return a copy of this PersistentBlock with <action> performed on
+        it, using <colour> if <action> is a paint, or None if the action
+        cannot be performed.
+        """
+        name, direction = action
+        c = self.children
+        if name == 'pass':
+            return self
+        elif name == 'smash':
+            if self.level == self.max_depth or c:
+                return None
+            block = Block((0, 0), 2 ** (self.max_depth - self.level),
+                          self.colour, self.level, self.max_depth)
+            block.smash()
+            return PersistentBlock.from_block(block)
+        elif name == 'paint':
+            if c or self.level != self.max_depth or self.colour == colour:
+                return None
+            return PersistentBlock(colour, self.level, self.max_depth)
+        elif not c:
+            return None
+        elif name == 'combine':
+            majority = _majority_colour(c)
+            if self.level != self.max_depth - 1 or majority is None:
+                return None
+            return PersistentBlock(majority, self.level, self.max_depth)
+        elif name == 'rotate':
+            return self._rotated(direction)
+        elif direction == 1:
+            children = (c[3], c[2], c[1], c[0])
         else:
-            descendents = []
-            for child in self.children:
-                descendents.append(child.create_copy())
-            top_block.children = descendents
-            return top_block
+            children = (c[1], c[0], c[3], c[2])
+        return PersistentBlock(None, self.level, self.max_depth, children)
+
+    def _rotated(self, direction: int) -> PersistentBlock:
+        """Return a copy of this PersistentBlock and all its descendants
+        rotated clockwise if <direction> is 1, or counter-clockwise if
+        <direction> is 3.
+        """
+        c = self.children
+        if not c:
+            return self
+        if direction == 1:
+            c = (c[1], c[2], c[3], c[0])
+        else:
+            c = (c[3], c[0], c[1], c[2])
+        return PersistentBlock(None, self.level, self.max_depth,
+                               tuple(child._rotated(direction) for child in c))
 
 
 if __name__ == '__main__':
@@ -338,7 +1118,7 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
-            'settings'
+            'settings', 'numpy', 'bisect'
         ],
         'max-attributes': 15,
         'max-args': 6
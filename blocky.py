@@ -23,12 +23,12 @@ This file contains the different game states for the Blocky game.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 import pygame
 
-from actions import ACTION_MESSAGE, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
+from actions import ACTION_MESSAGE
 from block import Block
+from engine import GameData
 from player import Player
 from renderer import Renderer
 from settings import ANIMATION_DURATION
@@ -57,69 +57,6 @@ def _block_to_squares(board: Block) -> List[Tuple[Tuple[int, int, int],
         return squares
 
 
-class GameData:
-    """
-    A bundle of the data needed for a Blocky game.
-
-    === Public Attributes ===
-    max_turns:
-        The maximum number of turns for the game.
-    board:
-        The Blocky board on which this game will be played.
-    players:
-        The entities that are playing this game.
-    smashes:
-        The number of smashes done by each player.
-    combines:
-        The number of combines done by each player.
-    paints:
-        The number of paints done by each player.
-
-    === Representation Invariants ===
-    - len(players) >= 1
-    """
-    max_turns: int
-    board: Block
-    players: List[Player]
-    smashes: Dict[int, int]
-    combines: Dict[int, int]
-    paints: Dict[int, int]
-
-    def __init__(self, board: Block, players: List[Player]) -> None:
-        """Initialize the game data, saving a reference to <board> and
-        <players>.
-
-        Precondition:
-            - len(players) >= 1
-        """
-        self.max_turns = 0
-        self.board = board
-        self.players = players
-
-        self.smashes = {}
-        self.combines = {}
-        self.paints = {}
-
-        # Start off all counts at 0
-        for player in players:
-            self.smashes[player.id] = 0
-            self.combines[player.id] = 0
-            self.paints[player.id] = 0
-
-    def calculate_score(self, player_id: int) -> Tuple[int, int]:
-        """Return a tuple containing first the <player_id>'s score based on
-        their goal in the game and second the deductions from their score based
-        on the actions they've taken.
-        """
-        goal_score = self.players[player_id].goal.score(self.board)
-
-        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
-                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
-                  self.paints[player_id] * ACTION_PENALTY[PAINT]
-
-        return goal_score, penalty
-
-
 class GameState:
     """One of the different states that a Blocky game can be in.
     """
@@ -154,11 +91,18 @@ class MainState(GameState):
     #   The index of the current player in GameData.players.
     # _current_score:
     #   The score of the current player, including penalties.
+    # _squares:
+    #   The squares of the board, as of when its structural hash was
+    #   _squares_hash.
+    # _squares_hash:
+    #   The structural hash of the board when _squares was made, or None.
     """
     _turn: int
     _data: GameData
     _current_player_index: int
     _current_score: int
+    _squares: List[Tuple[Tuple[int, int, int], Tuple[int, int], int]]
+    _squares_hash: Optional[int]
 
     def __init__(self, data: GameData) -> None:
         """Initialize this GameState.
@@ -166,6 +110,8 @@ class MainState(GameState):
         self._turn = 0
         self._data = data
         self._current_player_index = 0
+        self._squares = []
+        self._squares_hash = None
 
         score, penalty = self._data.calculate_score(self._current_player().id)
         self._current_score = score - penalty
@@ -175,6 +121,17 @@ class MainState(GameState):
         """
         return self._data.players[self._current_player_index]
 
+    def _board_squares(self) -> List[Tuple[Tuple[int, int, int],
+                                          Tuple[int, int], int]]:
+        """Return the squares to draw for the board, which are only found
+        again once the board has changed.
+        """
+        board_hash = self._data.board.structural_hash()
+        if board_hash != self._squares_hash:
+            self._squares = _block_to_squares(self._data.board)
+            self._squares_hash = board_hash
+        return self._squares
+
     def _update_player(self) -> None:
         """Update the player whose turn it is.
         """
@@ -190,29 +147,7 @@ class MainState(GameState):
     def _do_move(self, move: Tuple[str, Optional[int], Block]) -> bool:
         """Attempt to do the player's requested move.
         """
-        action = (move[0], move[1])
-        direction = move[1]
-        block = move[2]
-        player = self._current_player()
-        move_successful = False
-
-        if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-            move_successful = block.rotate(direction)
-        elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
-            move_successful = block.swap(direction)
-        elif action == SMASH:
-            move_successful = block.smash()
-            self._data.smashes[player.id] += int(move_successful)
-        elif action == PAINT:
-            move_successful = block.paint(self._current_player().goal.colour)
-            self._data.paints[player.id] += int(move_successful)
-        elif action == COMBINE:
-            move_successful = block.combine()
-            self._data.combines[player.id] += int(move_successful)
-        elif action == PASS:
-            # Do nothing
-            move_successful = True
-
+        move_successful = self._data.apply_move(self._current_player(), move)
         if move_successful:
             self._update_player()
 
@@ -242,7 +177,7 @@ class MainState(GameState):
             return self
         else:
             # Save what the board looks like before the move
-            background = _block_to_squares(self._data.board)
+            background = self._board_squares()
             # Also save the current player ID
             player_id = self._current_player().id
 
@@ -258,7 +193,7 @@ class MainState(GameState):
         """Render the current status and selected block
         (if any) of the game onto the screen using <renderer>.
         """
-        renderer.draw_board(_block_to_squares(self._data.board))
+        renderer.draw_board(self._board_squares())
 
         b = self._current_player().get_selected_block(self._data.board)
         if b is not None:
@@ -398,7 +333,7 @@ if __name__ == '__main__':
         'allowed-io': ['run_game'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'pygame', '__future__',
-            'block', 'player', 'renderer', 'settings', 'actions'
+            'block', 'player', 'renderer', 'settings', 'actions', 'engine'
         ],
         'generated-members': 'pygame.*'
     })
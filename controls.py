@@ -0,0 +1,95 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the key bindings of the Blocky game, and the functions
+that read the user's input from pygame events.
+
+This is the only module outside of the user interface that imports pygame.
+Players import it the first time they handle an event, so that the game
+can be simulated without loading pygame at all.
+"""
+from typing import Optional, Tuple
+import pygame
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, COMBINE, PAINT, PASS
+
+ACTION_KEY = {
+    ROTATE_CLOCKWISE: pygame.K_d,
+    ROTATE_COUNTER_CLOCKWISE: pygame.K_a,
+    SWAP_HORIZONTAL: pygame.K_q,
+    SWAP_VERTICAL: pygame.K_e,
+    SMASH: pygame.K_SPACE,
+    COMBINE: pygame.K_c,
+    PAINT: pygame.K_r,
+    PASS: pygame.K_TAB
+}
+
+# Create a dictionary that is ACTION_KEY inverted
+KEY_ACTION = {value: key for key, value in ACTION_KEY.items()}
+
+# The change in the selected level for each key that changes it
+KEY_LEVEL = {
+    pygame.K_w: -1,
+    pygame.K_s: 1
+}
+
+
+def is_click(event: pygame.event.Event) -> bool:
+    """Return True iff <event> is a click of the left mouse button.
+    """
+    return event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
+
+
+def key_action(event: pygame.event.Event) -> \
+        Optional[Tuple[str, Optional[int]]]:
+    """Return the action bound to the key pressed in <event>, or None if
+    <event> is not the press of such a key.
+    """
+    if event.type == pygame.KEYDOWN:
+        return KEY_ACTION.get(event.key)
+    return None
+
+
+def key_level(event: pygame.event.Event) -> int:
+    """Return the change in the selected level for the key pressed in
+    <event>, or 0 if <event> is not the press of a key that changes it.
+    """
+    if event.type == pygame.KEYDOWN:
+        return KEY_LEVEL.get(event.key, 0)
+    return 0
+
+
+def mouse_position() -> Tuple[int, int]:
+    """Return the position of the mouse on the screen.
+    """
+    return pygame.mouse.get_pos()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', 'pygame', 'actions'
+        ],
+        'generated-members': 'pygame.*'
+    })
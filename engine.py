@@ -0,0 +1,241 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the game data and moves of the Blocky game, and a
+headless engine that plays games between computer players without a
+display, a clock or any rendering.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import time
+
+from actions import SMASH, PAINT, COMBINE, PASS, ACTION_PENALTY
+from block import Block, generate_board
+from player import Player, create_players
+from settings import BOARD_SIZE
+
+# The number of times a player is asked for a move in a headless game before
+# its turn is taken as a pass, since a RandomPlayer may pick a block with no
+# valid moves.
+_MAX_ATTEMPTS = 100
+
+
+class GameData:
+    """
+    A bundle of the data needed for a Blocky game.
+
+    === Public Attributes ===
+    max_turns:
+        The maximum number of turns for the game.
+    board:
+        The Blocky board on which this game will be played.
+    players:
+        The entities that are playing this game.
+    smashes:
+        The number of smashes done by each player.
+    combines:
+        The number of combines done by each player.
+    paints:
+        The number of paints done by each player.
+
+    === Private Attributes ===
+    _tracked_hash:
+        The structural hash of <board> when the players' goals last tracked
+        it or were updated by record_move.
+
+    === Representation Invariants ===
+    - len(players) >= 1
+    """
+    max_turns: int
+    board: Block
+    players: List[Player]
+    smashes: Dict[int, int]
+    combines: Dict[int, int]
+    paints: Dict[int, int]
+    _tracked_hash: int
+
+    def __init__(self, board: Block, players: List[Player]) -> None:
+        """Initialize the game data, saving a reference to <board> and
+        <players>.
+
+        Precondition:
+            - len(players) >= 1
+        """
+        self.max_turns = 0
+        self.board = board
+        self.players = players
+
+        self.smashes = {}
+        self.combines = {}
+        self.paints = {}
+
+        # Start off all counts at 0
+        for player in players:
+            self.smashes[player.id] = 0
+            self.combines[player.id] = 0
+            self.paints[player.id] = 0
+
+        # Track each goal's score so that moves can update it incrementally
+        self._track()
+
+    def _track(self) -> None:
+        """Make every player's goal track the board from scratch.
+        """
+        for player in self.players:
+            player.goal.track(self.board)
+        self._tracked_hash = self.board.structural_hash()
+
+    def record_move(self, block: Block,
+                    action: Tuple[str, Optional[int]]) -> None:
+        """Update the score of every player's goal after <action> was
+        successfully performed on <block>, which is part of the board.
+        """
+        for player in self.players:
+            player.goal.update_score(block, action)
+        self._tracked_hash = self.board.structural_hash()
+
+    def apply_move(self, player: Player,
+                   move: Tuple[str, Optional[int], Block]) -> bool:
+        """Attempt to do the move that <player> requested, count it towards
+        <player>'s penalties, and update every goal's score.
+
+        Return True iff the move was successful.
+        """
+        action = (move[0], move[1])
+        block = move[2]
+
+        move_successful = block.perform(action, player.goal.colour)
+        if action == SMASH:
+            self.smashes[player.id] += int(move_successful)
+        elif action == PAINT:
+            self.paints[player.id] += int(move_successful)
+        elif action == COMBINE:
+            self.combines[player.id] += int(move_successful)
+
+        if move_successful:
+            self.record_move(block, action)
+        return move_successful
+
+    def calculate_score(self, player_id: int) -> Tuple[int, int]:
+        """Return a tuple containing first the <player_id>'s score based on
+        their goal in the game and second the deductions from their score based
+        on the actions they've taken.
+
+        If the board has changed since the goals last tracked it, other than
+        by the moves passed to record_move, or has been replaced, the goals
+        track it again first, so the score is never stale.
+        """
+        if self.board.structural_hash() != self._tracked_hash:
+            self._track()
+        goal_score = self.players[player_id].goal.tracked_score()
+
+        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
+                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
+                  self.paints[player_id] * ACTION_PENALTY[PAINT]
+
+        return goal_score, penalty
+
+
+class HeadlessGame:
+    """A game of Blocky between computer players, played as fast as the
+    players can choose their moves.
+
+    === Public Attributes ===
+    data:
+        The data of the game.
+    moves:
+        The number of moves made by each player, by player id, including
+        passes.
+    seconds:
+        The time each player has spent choosing its moves, by player id.
+    """
+    data: GameData
+    moves: Dict[int, int]
+    seconds: Dict[int, float]
+
+    def __init__(self, board: Block, players: List[Player]) -> None:
+        """Initialize a game on <board> between <players>.
+
+        Precondition:
+            - len(players) >= 1
+            - no player is a HumanPlayer
+        """
+        self.data = GameData(board, players)
+        self.moves = {player.id: 0 for player in players}
+        self.seconds = {player.id: 0.0 for player in players}
+
+    def play(self, num_turns: int) -> List[Tuple[int, int, int]]:
+        """Play <num_turns> turns, in each of which every player makes one
+        move, and return the id, goal score and penalty of each player.
+        """
+        self.data.max_turns += num_turns
+        for _ in range(num_turns):
+            for player in self.data.players:
+                self.play_move(player)
+        return self.scores()
+
+    def play_move(self, player: Player) -> None:
+        """Ask <player> for moves until it makes a successful one, and do it.
+
+        If it has not made one after _MAX_ATTEMPTS tries, it passes.
+        """
+        board = self.data.board
+        for _ in range(_MAX_ATTEMPTS):
+            start = time.perf_counter()
+            player.request_move()
+            move = player.generate_move(board)
+            self.seconds[player.id] += time.perf_counter() - start
+            if move is not None and self.data.apply_move(player, move):
+                break
+        else:
+            self.data.apply_move(player, (PASS[0], PASS[1], board))
+        self.moves[player.id] += 1
+
+    def scores(self) -> List[Tuple[int, int, int]]:
+        """Return the id, goal score and penalty of each player.
+        """
+        scores = []
+        for player in self.data.players:
+            goal_score, penalty = self.data.calculate_score(player.id)
+            scores.append((player.id, goal_score, penalty))
+        return scores
+
+
+def create_headless_game(max_depth: int, num_random: int,
+                         smart_players: List[int]) -> HeadlessGame:
+    """Return a new headless game on a random board with a depth of
+    <max_depth>, between <num_random> random players and one SmartPlayer for
+    each difficulty in <smart_players>, as create_players makes them.
+    """
+    board = generate_board(max_depth, BOARD_SIZE)
+    players = create_players(0, num_random, smart_players)
+    return HeadlessGame(board, players)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'time', 'actions',
+            'block', 'player', 'settings'
+        ]
+    })
@@ -25,15 +25,26 @@ tests!
 """
 from typing import List, Optional, Tuple
 import os
+import random
+import subprocess
+import sys
 import pygame
 import pytest
 
-from block import Block
+import goal as goal_module
+from actions import COMBINE, PAINT, PASS, ROTATE_CLOCKWISE, \
+    ROTATE_COUNTER_CLOCKWISE, SMASH, SWAP_HORIZONTAL, SWAP_VERTICAL
+from block import Block, BlockIndex, PersistentBlock, generate_board, \
+    undo_move
 from blocky import _block_to_squares
-from goal import BlobGoal, PerimeterGoal, _flatten
-from player import _get_block
+from engine import GameData, HeadlessGame
+from goal import BlobGoal, PerimeterGoal, ScoreCache, _flatten
+from linear_board import LinearBoard
+from player import AlphaBetaPlayer, MCTSPlayer, ParallelSmartPlayer, \
+    RandomPlayer, SmartPlayer, _enumerate_moves, _get_block, _search_chunks
 from renderer import Renderer
 from settings import COLOUR_LIST
+from tournament import create_bots, run_tournament
 
 
 def set_children(block: Block, colours: List[Optional[Tuple[int, int, int]]]) \
@@ -205,6 +216,46 @@ class TestRender:
         renderer.draw_board(_block_to_squares(board_16x16))
         renderer.save_to_file('your-rotate-1.png')
 
+    def test_render_only_changed_squares(self, renderer, board_16x16,
+                                         tmp_path) -> None:
+        """Test that redrawing a board after a move, which only draws the
+        squares that changed, gives the same image as drawing it afresh.
+        """
+        renderer.draw_board(_block_to_squares(board_16x16))
+        renderer.highlight_block((0, 0), 8)
+        edge = board_16x16.children[0].children[0]
+        renderer.highlight_block(edge.position, edge.size)
+        board_16x16.children[0].rotate(1)
+        renderer.clear()
+        renderer.draw_board(_block_to_squares(board_16x16))
+        renderer.save_to_file(str(tmp_path / 'redrawn.png'))
+
+        fresh = Renderer(750)
+        fresh.draw_board(_block_to_squares(board_16x16))
+        fresh.save_to_file(str(tmp_path / 'fresh.png'))
+
+        redrawn = pygame.image.load(str(tmp_path / 'redrawn.png'))
+        expected = pygame.image.load(str(tmp_path / 'fresh.png'))
+        assert pygame.image.tostring(redrawn, 'RGB') == \
+            pygame.image.tostring(expected, 'RGB')
+
+    def test_render_images_scaled_in_advance(self, renderer, board_16x16,
+                                             monkeypatch) -> None:
+        """Test that a Renderer made for a board's max_depth draws the image
+        of an action on any block of that board without scaling it, unlike
+        a Renderer made without one.
+        """
+        assert len(renderer._scaled) == 0
+        renderer = Renderer(750, board_16x16.max_depth)
+
+        def scale(*args) -> None:
+            raise AssertionError('an image was scaled while drawing')
+
+        monkeypatch.setattr(pygame.transform, 'scale', scale)
+        for block in [board_16x16, board_16x16.children[0],
+                      board_16x16.children[0].children[0]]:
+            renderer.draw_image(SMASH, block.position, block.size)
+
 
 class TestBlock:
     """A collection of methods that test the Block class.
@@ -257,6 +308,150 @@ class TestBlock:
         board_16x16.children[0].rotate(1)
         assert board_16x16 == board_16x16_rotate1
 
+    def test_descendant_positions_follow_moves(self, board_16x16) -> None:
+        """Test that the positions of the reference board's descendants follow
+        swaps and rotations of the board.
+        """
+        grandchild = board_16x16.children[0].children[0]
+        assert grandchild.position == (563, 0)
+
+        board_16x16.swap(0)
+        assert grandchild.position == (188, 0)
+
+        board_16x16.rotate(3)
+        assert grandchild.position == (0, 375)
+
+    def test_swap_child_after_rotate(self, board_16x16) -> None:
+        """Test that a child of the reference board is swapped in its rotated
+        orientation when the board has been rotated.
+        """
+        expected = board_16x16.create_copy()
+        expected.children[0].swap(1)
+
+        child = board_16x16.children[0]
+        board_16x16.rotate(1)
+        child.swap(0)
+        board_16x16.rotate(3)
+        assert board_16x16 == expected
+
+    def test_structural_hash(self, board_16x16, board_16x16_swap0) -> None:
+        """Test that the structural hash of the reference board follows its
+        moves, and agrees with equality.
+        """
+        original = hash(board_16x16)
+        assert hash(board_16x16.create_copy()) == original
+
+        board_16x16.swap(0)
+        assert hash(board_16x16) == hash(board_16x16_swap0)
+        assert hash(board_16x16) != original
+
+        for _ in range(4):
+            board_16x16.rotate(1)
+        board_16x16.swap(0)
+        assert hash(board_16x16) == original
+
+    def test_equality_after_moving_hand_built_board(self, board_16x16) \
+            -> None:
+        """Test that a board built by assigning its children still compares
+        equal to an equal board after one of its descendants is moved.
+        """
+        other = board_16x16.create_copy()
+        assert board_16x16 == other
+
+        board_16x16.children[0].children[0].paint(COLOUR_LIST[3])
+        assert board_16x16 != other
+        other.children[0].children[0].paint(COLOUR_LIST[3])
+        assert board_16x16 == other
+        assert hash(board_16x16) == hash(other)
+
+    def test_flatten_after_assigning_attributes(self, board_16x16) -> None:
+        """Test that flattening the reference board again after its colour and
+        children attributes are assigned shows the new cells.
+        """
+        _flatten(board_16x16)
+        board_16x16.children[0].children[0].colour = COLOUR_LIST[3]
+        assert _flatten(board_16x16)[3][0] == COLOUR_LIST[3]
+
+        set_children(board_16x16.children[1], [COLOUR_LIST[0]] * 4)
+        assert _flatten(board_16x16)[0][0] == COLOUR_LIST[0]
+
+    def test_move_predicates(self, board_16x16) -> None:
+        """Test that the move predicates of the reference board agree with
+        which moves succeed, without changing the board.
+        """
+        parent = board_16x16.children[0]
+        leaf = parent.children[0]
+
+        assert parent.can_rotate() and parent.can_swap()
+        assert parent.can_combine()
+        assert not parent.smashable()
+        assert not leaf.can_rotate() and not leaf.can_combine()
+        assert leaf.can_paint(COLOUR_LIST[1])
+        assert not leaf.can_paint(COLOUR_LIST[0])
+        assert board_16x16.children[1].smashable()
+
+        parent.combine()
+        assert parent.colour == COLOUR_LIST[1]
+
+    def test_undo_move(self, board_16x16) -> None:
+        """Test that moves performed on the reference board with a log can be
+        reverted, restoring the original board.
+        """
+        original = board_16x16.create_copy()
+        parent = board_16x16.children[0]
+        log = []
+
+        assert parent.perform(ROTATE_CLOCKWISE, COLOUR_LIST[0], log)
+        assert parent.children[3].perform(PAINT, COLOUR_LIST[2], log)
+        assert parent.perform(COMBINE, COLOUR_LIST[0], log)
+        assert board_16x16.children[1].perform(SMASH, COLOUR_LIST[0], log)
+        assert not board_16x16.children[2].perform(COMBINE, COLOUR_LIST[0], log)
+        assert len(log) == 4
+
+        while log:
+            undo_move(log)
+        assert board_16x16 == original
+
+    def test_persistent_swap(self, board_16x16, board_16x16_swap0) -> None:
+        """Test that swapping a persistent reference board returns a new root
+        that shares its subtrees with the original, which is unchanged.
+        """
+        original = PersistentBlock.from_block(board_16x16)
+        swapped = original.perform([], SWAP_HORIZONTAL, COLOUR_LIST[0])
+
+        assert swapped.to_block((0, 0), 750) == board_16x16_swap0
+        assert original.to_block((0, 0), 750) == board_16x16
+        assert swapped.children[1] is original.children[0]
+
+        painted = original.perform([0, 0], PAINT, COLOUR_LIST[3])
+        assert painted.descendant([0, 0]).colour == COLOUR_LIST[3]
+        assert painted.children[1] is original.children[1]
+        assert original.perform([1], PAINT, COLOUR_LIST[3]) is None
+
+    def test_linear_board(self, board_16x16, board_16x16_rotate1,
+                          flattened_board_16x16) -> None:
+        """Test that a linear quadtree of the reference board can be looked up,
+        flattened and rotated like the Block it was made from.
+        """
+        board = LinearBoard.from_block(board_16x16)
+        top_right = (board.size - 1, 0)
+        node = board.block_at(top_right, 1)
+
+        assert board.to_block() == board_16x16
+        assert board.flatten() == flattened_board_16x16
+        assert board.children(0)[0] == node
+        assert board.colour(board.block_at(top_right, 2)) == COLOUR_LIST[0]
+
+        copy = board.copy()
+        assert copy.rotate(node, 1)
+        assert copy.to_block() == board_16x16_rotate1
+        assert board.to_block() == board_16x16
+
+        block = board.to_block()
+        leaf = block.children[0].children[0]
+        assert leaf._parent._parent is block
+        assert leaf.position == board_16x16.children[0].children[0].position
+
 
 class TestPlayer:
     """A collection of methods for testing the methods and functions in the
@@ -283,6 +478,157 @@ class TestPlayer:
         assert _get_block(board_16x16, top_right, 2) == \
             board_16x16.children[0].children[0]
 
+    def test_enumerate_moves(self, board_16x16) -> None:
+        """Test that every valid move on the reference board is enumerated
+        exactly once.
+        """
+        player = SmartPlayer(0, BlobGoal(COLOUR_LIST[0]), 1)
+        moves = [(id(block), action)
+                 for block, action in _enumerate_moves(player, board_16x16)]
+        assert len(moves) == len(set(moves))
+
+        parent = board_16x16.children[0]
+        assert moves[:4] == [(id(board_16x16), action) for action in
+                             [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,
+                              SWAP_HORIZONTAL, SWAP_VERTICAL]]
+        assert (id(parent), COMBINE) in moves
+        assert (id(parent.children[0]), PAINT) not in moves
+        assert (id(parent.children[3]), PAINT) in moves
+        assert (id(board_16x16.children[1]), SMASH) in moves
+        # Rotations and swaps of 2 blocks, 1 combine, 3 smashes and 3 paints.
+        assert len(moves) == 2 * 4 + 1 + 3 + 3
+
+    def test_smart_player_budget(self, board_16x16) -> None:
+        """Test that a SmartPlayer with a time budget keeps scoring moves on
+        the reference board until its budget is spent, and reports how many
+        it scored.
+        """
+        click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1)
+        player = SmartPlayer(0, BlobGoal(COLOUR_LIST[1]), 5)
+        player.process_event(click)
+        player.generate_move(board_16x16)
+        assert player.evaluated == 5
+
+        player = SmartPlayer(0, BlobGoal(COLOUR_LIST[1]), 5, budget=0.02)
+        player.process_event(click)
+        assert player.generate_move(board_16x16) is not None
+        assert player.evaluated > 5
+
+    def test_mcts_player(self, board_16x16) -> None:
+        """Test that an MCTSPlayer leaves the reference board unchanged while
+        searching it, and reuses its search tree when it passes.
+        """
+        click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1)
+        player = MCTSPlayer(0, PerimeterGoal(COLOUR_LIST[1]), 50)
+        original = board_16x16.create_copy()
+        player.process_event(click)
+        action, direction, block = player.generate_move(board_16x16)
+        assert board_16x16 == original
+        assert player.evaluated == 50
+        assert block.perform((action, direction), COLOUR_LIST[1]) or \
+            action == PASS[0]
+
+        # A board with no moves that can help makes the player pass, and the
+        # tree it searched is reused on its next turn.
+        board = Block((0, 0), 750, COLOUR_LIST[1], 0, 1)
+        player.process_event(click)
+        assert player.generate_move(board)[:2] == PASS
+        visits = player._root.visits
+        player.process_event(click)
+        player.generate_move(board)
+        assert player._root.visits == visits + 50
+
+    def test_mcts_player_reuses_tree_after_opponent(self, board_16x16) \
+            -> None:
+        """Test that an MCTSPlayer reuses its search tree when the other
+        player of a two player game makes a move that the tree has tried.
+        """
+        click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1)
+        player = MCTSPlayer(0, PerimeterGoal(COLOUR_LIST[1]), 200)
+        random.seed(148)
+        player.process_event(click)
+        action, direction, block = player.generate_move(board_16x16)
+        block.perform((action, direction), COLOUR_LIST[1])
+
+        # The other player rotates or swaps a block, as the tree has tried.
+        kept = player._root
+        moves = [move for move in kept.children
+                 if move[2] in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,
+                                SWAP_HORIZONTAL, SWAP_VERTICAL]]
+        assert moves
+        block = _get_block(board_16x16, moves[0][0], moves[0][1])
+        assert block.perform(moves[0][2], COLOUR_LIST[3])
+        node = kept.children[moves[0]]
+        visits = node.visits
+
+        player.process_event(click)
+        player.generate_move(board_16x16)
+        assert node.visits == visits + 200
+
+    def test_alpha_beta_player(self, board_16x16) -> None:
+        """Test that an AlphaBetaPlayer searches the reference board to its
+        full depth without changing it, and passes rather than pay a penalty
+        for nothing.
+        """
+        click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1)
+        opponent = SmartPlayer(1, BlobGoal(COLOUR_LIST[3]), 1)
+        player = AlphaBetaPlayer(0, PerimeterGoal(COLOUR_LIST[1]), 3,
+                                 [opponent])
+        original = board_16x16.create_copy()
+        player.process_event(click)
+        action, direction, block = player.generate_move(board_16x16)
+        assert board_16x16 == original
+        assert player.depth_reached == 3
+        assert block.perform((action, direction), COLOUR_LIST[1]) or \
+            action == PASS[0]
+
+        player = AlphaBetaPlayer(0, PerimeterGoal(COLOUR_LIST[1]), 2)
+        player.process_event(click)
+        board = Block((0, 0), 750, COLOUR_LIST[1], 0, 1)
+        assert player.generate_move(board)[:2] == PASS
+
+    def test_block_index(self, board_16x16) -> None:
+        """Test that a BlockIndex of the reference board finds the same
+        blocks as _get_block, including after the board is swapped.
+        """
+        index = BlockIndex(board_16x16)
+        locations = [(0, 0), (749, 0), (400, 200), (600, 100), (374, 749),
+                     (750, 0)]
+        for _ in range(2):
+            for location in locations:
+                for level in range(3):
+                    assert index.block_at(location, level) is \
+                        _get_block(board_16x16, location, level)
+            board_16x16.swap(0)
+
+    def test_parallel_smart_player_is_seeded(self, board_16x16) -> None:
+        """Test that a ParallelSmartPlayer chooses the same move on the
+        reference board for the same seed, whatever its number of workers.
+        """
+        for goal in [BlobGoal(COLOUR_LIST[1]), PerimeterGoal(COLOUR_LIST[0])]:
+            moves = []
+            for processes in (1, 2):
+                player = ParallelSmartPlayer(0, goal, 100, processes,
+                                             seed=148)
+                player.process_event(
+                    pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1))
+                action, direction, block = player.generate_move(board_16x16)
+                player.close()
+                moves.append((action, direction, block.position, block.level))
+            assert moves[0] == moves[1]
+
+    def test_search_chunks_are_independent(self) -> None:
+        """Test that the result of a chunk searched by a worker does not
+        depend on the chunks that the worker searched before it.
+        """
+        random.seed(4)
+        data = LinearBoard.from_block(generate_board(4, 750)).serialize()
+        goal = PerimeterGoal
+        alone = _search_chunks(data, goal, COLOUR_LIST[0], [(1, 30)], 7)
+        after = _search_chunks(data, goal, COLOUR_LIST[0], [(0, 30), (1, 30)],
+                               7)
+        assert alone[1] == after[1]
+
 
 class TestGoal:
     """A collection of methods for testing the sub-classes of Goal.
@@ -302,6 +648,27 @@ class TestGoal:
 
         assert result == flattened_board_16x16
 
+    def test_block_flatten_after_swap(self, board_16x16,
+                                      board_16x16_swap0) -> None:
+        """Test that the unit cells cached by flattening the reference board are
+        discarded when the board is swapped.
+        """
+        _flatten(board_16x16)
+        board_16x16.swap(0)
+
+        assert _flatten(board_16x16) == _flatten(board_16x16_swap0)
+
+    def test_block_to_grid(self, board_16x16, flattened_board_16x16) -> None:
+        """Test that the palette indices of the reference board match the
+        expected list of colours.
+        """
+        pytest.importorskip('numpy')
+        grid = board_16x16.to_grid()
+
+        assert grid.shape == (4, 4)
+        assert [[COLOUR_LIST[i] for i in column] for column in grid] == \
+            flattened_board_16x16
+
     def test_blob_goal(self, board_16x16) -> None:
         correct_scores = [
             (COLOUR_LIST[0], 1),
@@ -315,6 +682,31 @@ class TestGoal:
             goal = BlobGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_blob_goal_without_numpy(self, board_16x16, monkeypatch) -> None:
+        """Test that the pure-Python blob scorer agrees with the expected
+        scores of the reference board.
+        """
+        monkeypatch.setattr(goal_module, '_has_numpy', lambda: False)
+        correct_scores = [
+            (COLOUR_LIST[0], 1),
+            (COLOUR_LIST[1], 4),
+            (COLOUR_LIST[2], 4),
+            (COLOUR_LIST[3], 5)
+        ]
+
+        for colour, expected in correct_scores:
+            goal = BlobGoal(colour)
+            assert goal.score(board_16x16) == expected
+
+    def test_blob_goal_deep_board(self, monkeypatch) -> None:
+        """Test that a blob covering a 256x256 board is scored without
+        exceeding the recursion limit.
+        """
+        monkeypatch.setattr(goal_module, '_has_numpy', lambda: False)
+        board = Block((0, 0), 750, COLOUR_LIST[0], 0, 8)
+
+        assert BlobGoal(COLOUR_LIST[0]).score(board) == 256 * 256
+
     def test_perimeter_goal(self, board_16x16):
         correct_scores = [
             (COLOUR_LIST[0], 2),
@@ -328,6 +720,146 @@ class TestGoal:
             goal = PerimeterGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_perimeter_goal_undivided_board(self) -> None:
+        """Test that an undivided board counts each of its edge unit cells once,
+        and each of its corner unit cells twice.
+        """
+        board = Block((0, 0), 750, COLOUR_LIST[0], 0, 3)
+
+        assert PerimeterGoal(COLOUR_LIST[0]).score(board) == 4 * 8
+        assert PerimeterGoal(COLOUR_LIST[1]).score(board) == 0
+
+    def test_update_score(self, board_16x16) -> None:
+        """Test that the incrementally updated scores of the reference board
+        match its scores after a rotation and a paint.
+        """
+        goals = [BlobGoal(colour) for colour in COLOUR_LIST] + \
+            [PerimeterGoal(colour) for colour in COLOUR_LIST]
+        for goal in goals:
+            goal.track(board_16x16)
+
+        moves = [(board_16x16.children[0], ROTATE_CLOCKWISE),
+                 (board_16x16.children[0].children[3], PAINT)]
+        board_16x16.children[0].rotate(1)
+        board_16x16.children[0].children[3].paint(COLOUR_LIST[2])
+
+        for goal in goals:
+            before = goal.tracked_score()
+            delta = sum(goal.update_score(block, action)
+                        for block, action in moves)
+            assert goal.tracked_score() == before + delta
+            assert goal.tracked_score() == goal.score(board_16x16)
+
+    def test_score_cache(self, board_16x16) -> None:
+        """Test that a score cached for the reference board is reused for an
+        equal board reached by other moves, and only for the same goal.
+        """
+        cache = ScoreCache(2)
+        goal = BlobGoal(COLOUR_LIST[1])
+        expected = goal.score(board_16x16)
+        assert goal.cached_score(board_16x16, cache) == expected
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        board_16x16.children[0].rotate(1)
+        board_16x16.children[0].rotate(3)
+        assert goal.cached_score(board_16x16, cache) == expected
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        other = PerimeterGoal(COLOUR_LIST[1])
+        assert other.cached_score(board_16x16, cache) == \
+            other.score(board_16x16)
+        assert cache.misses == 2
+
+        BlobGoal(COLOUR_LIST[2]).cached_score(board_16x16, cache)
+        assert len(cache) == 2
+        assert cache.lookup(board_16x16, goal) is None
+
+
+class TestEngine:
+    """A collection of methods for testing the headless game engine.
+    """
+    def test_headless_game(self, board_16x16) -> None:
+        """Test that a headless game on the reference board gives every
+        player one move per turn, and scores them as their goals do.
+        """
+        players = [RandomPlayer(0, PerimeterGoal(COLOUR_LIST[0])),
+                   SmartPlayer(1, BlobGoal(COLOUR_LIST[1]), 5)]
+        game = HeadlessGame(board_16x16, players)
+        scores = game.play(4)
+
+        assert game.moves == {0: 4, 1: 4}
+        for player_id, goal_score, penalty in scores:
+            goal = players[player_id].goal
+            assert goal_score == goal.score(board_16x16)
+            assert (goal_score, penalty) == \
+                game.data.calculate_score(player_id)
+
+    def test_score_after_board_changes_outside_game(self, board_16x16) \
+            -> None:
+        """Test that a player's score follows changes to the board that were
+        not made through GameData, and a board that has been replaced.
+        """
+        players = [RandomPlayer(0, BlobGoal(COLOUR_LIST[1])),
+                   RandomPlayer(1, PerimeterGoal(COLOUR_LIST[3]))]
+        data = GameData(board_16x16, players)
+        board_16x16.children[0].colour = COLOUR_LIST[1]
+        board_16x16.children[1].swap(0)
+        for player in players:
+            assert data.calculate_score(player.id) == \
+                (player.goal.score(board_16x16), 0)
+
+        data.board = Block((0, 0), 750, COLOUR_LIST[1], 0, 2)
+        assert data.calculate_score(0) == (16, 0)
+
+    def test_create_bots_opponent_order(self) -> None:
+        """Test that each AlphaBetaPlayer made for a tournament looks ahead
+        over every other player, in the order they move after it.
+        """
+        players = create_bots(['alphabeta:1', 'random', 'alphabeta:1',
+                               'smart:1'])
+        assert [player.id for player in players] == [0, 1, 2, 3]
+        assert players[0]._players == players
+        assert players[2]._players == players[2:] + players[:2]
+
+    def test_tournament_is_seeded(self, tmp_path) -> None:
+        """Test that a tournament writes a line for every player of every
+        game, and that replaying it gives the same results.
+        """
+        bots = ['random', 'smart:2', 'mcts:5']
+        path = str(tmp_path / 'results.jsonl')
+        results = run_tournament(bots, 2, path, max_depth=2, num_turns=2,
+                                 processes=1, seed=148)
+        with open(path) as file:
+            assert len(file.readlines()) == len(results) == 3 * 2 * 2
+
+        again = run_tournament(bots, 2, str(tmp_path / 'again.csv'),
+                               max_depth=2, num_turns=2, processes=1,
+                               seed=148)
+        for result, other in zip(results, again):
+            assert result['moves'] == 2
+            assert {**result, 'seconds': 0} == {**other, 'seconds': 0}
+
+    def test_engine_does_not_load_pygame(self) -> None:
+        """Test that the headless engine and the players can be imported
+        without loading pygame.
+        """
+        statement = 'import engine, tournament, sys; ' \
+                    "print('pygame' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', statement],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert output.stdout.strip() == 'False'
+
+    def test_engine_does_not_load_numpy(self) -> None:
+        """Test that NumPy is not imported until a board is first scored.
+        """
+        statement = 'import engine, tournament, sys; ' \
+                    "print('numpy' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', statement],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert output.stdout.strip() == 'False'
+
 
 if __name__ == '__main__':
     pytest.main(['example_tests.py'])
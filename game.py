@@ -61,7 +61,7 @@ class Game:
         board = generate_board(max_depth, BOARD_SIZE)
         players = create_players(num_human, num_random, smart_players)
 
-        self._renderer = Renderer(BOARD_SIZE)
+        self._renderer = Renderer(BOARD_SIZE, max_depth)
         self._data = GameData(board, players)
         self._state = MainState(self._data)
 
@@ -88,8 +88,8 @@ class Game:
             self._renderer.clear()
             self._state.render(self._renderer)
 
-            # Update the screen
-            pygame.display.flip()
+            # Update the parts of the screen that changed
+            self._renderer.update_display()
 
 
 def create_auto_game() -> Game:
@@ -22,10 +22,22 @@ Misha Schwartz, and Jaisie Sin
 This file contains the hierarchy of Goal classes.
 """
 from __future__ import annotations
+import heapq
 import random
-from typing import List, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Dict, Hashable, List, Optional, Tuple, TYPE_CHECKING
+
+from actions import PASS
 from block import Block
-from settings import colour_name, COLOUR_LIST
+from settings import colour_name, colour_index, COLOUR_LIST
+
+# NumPy is optional; goals fall back to _flatten without it. It is imported
+# the first time a board is scored rather than here, since importing it takes
+# longer than the rest of the game.
+if TYPE_CHECKING:
+    import numpy as np
 
 
 def generate_goals(num_goals: int) -> List[Goal]:
@@ -63,24 +75,168 @@ def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
     of the block at the cell location[i][j]
 
     L[0][0] represents the unit cell in the upper left corner of the Block.
+
+    The unit cells are written into one preallocated list of lists, visiting
+    each block at most once and reusing the unit cells cached on any block
+    that has not changed since it was last flattened.
+    """
+    width = 2 ** (block.max_depth - block.level)
+    flattened = [[None] * width for _ in range(width)]
+    block.flatten_into(flattened)
+    return flattened
+
+
+# For each side of a Block (top, left, bottom and right), the indices of the
+# two children that lie along that side, in order of increasing column or row.
+_SIDE_CHILDREN = ((1, 0), (1, 2), (2, 3), (0, 3))
+
+# For each child of a Block, the offset of its upper left unit cell from the
+# Block's, in units of the child's width.
+_CHILD_OFFSETS = ((1, 0), (0, 0), (0, 1), (1, 1))
+
+
+def _cell_origin(board: Block, block: Block) -> Tuple[int, int]:
+    """Return the (column, row) of the upper left unit cell of <block> within
+    the unit cells of <board>.
+
+    Precondition: <block> is <board> or one of its descendants.
+    """
+    x, y = 0, 0
+    width = 2 ** (board.max_depth - board.level)
+    current = board
+    for _ in range(block.level - board.level):
+        width //= 2
+        for i, child in enumerate(current.children):
+            if child.position[0] <= block.position[0] < \
+                    child.position[0] + child.size and \
+                    child.position[1] <= block.position[1] < \
+                    child.position[1] + child.size:
+                x += _CHILD_OFFSETS[i][0] * width
+                y += _CHILD_OFFSETS[i][1] * width
+                current = child
+                break
+    return x, y
+
+
+def _edge_cells(block: Block, colour: Tuple[int, int, int], side: int) -> int:
+    """Return the number of unit cells of <colour> along one side of <block>.
+
+    <side> is 0, 1, 2 or 3 for the top, left, bottom or right side. Only the
+    descendants of <block> that touch that side are visited, and a leaf along
+    it counts once for each unit cell it spans.
+    """
+    if not block.children:
+        if block.colour == colour:
+            return 2 ** (block.max_depth - block.level)
+        return 0
+    first, second = _SIDE_CHILDREN[side]
+    return _edge_cells(block.children[first], colour, side) + \
+        _edge_cells(block.children[second], colour, side)
+
+
+def _edge_colours(block: Block, side: int,
+                  colours: List[Optional[Tuple[int, int, int]]],
+                  start: int) -> None:
+    """Write the colours of the unit cells along one side of <block> into
+    <colours>, beginning at index <start>.
+
+    <side> is 0, 1, 2 or 3 for the top, left, bottom or right side, and the
+    colours are written in order of increasing column or row.
     """
     if not block.children:
-        flattened = []
-        for _ in range(2 ** (block.max_depth - block.level)):
-            col = []
-            for _ in range(2 ** (block.max_depth - block.level)):
-                col.append(block.colour)
-            flattened.append(col)
+        width = 2 ** (block.max_depth - block.level)
+        colours[start:start + width] = [block.colour] * width
     else:
-        flattened = _flatten(block.children[1])
-        for i in range((2 ** (block.max_depth - block.level))//2):
-            flattened.append(_flatten(block.children[0])[i])
-        for i in range((2 ** (block.max_depth - block.level)) // 2):
-            flattened[i].extend(_flatten(block.children[2])[i])
-        for i in range((2 ** (block.max_depth - block.level)) // 2):
-            flattened[i + len(flattened)//2].\
-                extend(_flatten(block.children[3])[i])
-    return flattened
+        half = 2 ** (block.max_depth - block.level - 1)
+        first, second = _SIDE_CHILDREN[side]
+        _edge_colours(block.children[first], side, colours, start)
+        _edge_colours(block.children[second], side, colours, start + half)
+
+
+@lru_cache(maxsize=None)
+def _has_numpy() -> bool:
+    """Return True iff NumPy is installed, without importing it.
+    """
+    return find_spec('numpy') is not None
+
+
+def _largest_blob(mask: np.ndarray) -> int:
+    """Return the number of cells in the largest group of connected True
+    cells in the two-dimensional boolean array <mask>.
+
+    Cells are connected if their sides touch. The groups are found with a
+    vectorized union-find: every pair of connected cells hooks the larger of
+    their two roots onto the smaller one, and the roots are then compressed
+    until each cell points directly at the root of its group.
+    """
+    import numpy as np
+
+    if not mask.any():
+        return 0
+    width = mask.shape[0]
+    ids = np.arange(width * width).reshape(width, width)
+    across = mask[:-1, :] & mask[1:, :]
+    down = mask[:, :-1] & mask[:, 1:]
+    first = np.concatenate((ids[:-1, :][across], ids[:, :-1][down]))
+    second = np.concatenate((ids[1:, :][across], ids[:, 1:][down]))
+    roots = ids.ravel()
+    while True:
+        first_roots = roots[first]
+        second_roots = roots[second]
+        apart = first_roots != second_roots
+        if not apart.any():
+            break
+        first_roots = first_roots[apart]
+        second_roots = second_roots[apart]
+        np.minimum.at(roots, np.maximum(first_roots, second_roots),
+                      np.minimum(first_roots, second_roots))
+        compressed = roots[roots]
+        while not np.array_equal(compressed, roots):
+            roots = compressed
+            compressed = roots[roots]
+    return int(np.bincount(roots[mask.ravel()]).max())
+
+
+def _blob_sizes(flattened: List[List[Tuple[int, int, int]]]) -> \
+        Dict[Tuple[int, int, int], int]:
+    """Return a dictionary mapping each colour on the <flattened> board to the
+    number of unit cells in the largest blob of that colour.
+
+    All colours are scored in one sweep of a union-find over the cells stored
+    in a flat list, column by column, so no recursion is needed however large
+    the board is.
+    """
+    width = len(flattened)
+    cells = [cell for column in flattened for cell in column]
+    parent = list(range(len(cells)))
+    size = [1] * len(cells)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        i = find(i)
+        j = find(j)
+        if i != j:
+            if size[i] < size[j]:
+                i, j = j, i
+            parent[j] = i
+            size[i] += size[j]
+
+    for i, cell in enumerate(cells):
+        if i % width != 0 and cells[i - 1] == cell:
+            union(i, i - 1)
+        if i >= width and cells[i - width] == cell:
+            union(i, i - width)
+
+    sizes = {}
+    for i, cell in enumerate(cells):
+        if parent[i] == i and size[i] > sizes.get(cell, 0):
+            sizes[cell] = size[i]
+    return sizes
 
 
 class Goal:
@@ -92,13 +248,24 @@ class Goal:
     colour:
         The target colour for this goal, that is the colour to which
         this goal applies.
+
+    === Private Attributes ===
+    _board:
+        The board whose score this goal is tracking, or None if it is not
+        tracking a board.
+    _tracked_score:
+        The score for this goal on <_board>.
     """
     colour: Tuple[int, int, int]
+    _board: Optional[Block]
+    _tracked_score: int
 
     def __init__(self, target_colour: Tuple[int, int, int]) -> None:
         """Initialize this goal to have the given target colour.
         """
         self.colour = target_colour
+        self._board = None
+        self._tracked_score = 0
 
     def score(self, board: Block) -> int:
         """Return the current score for this goal on the given board.
@@ -107,6 +274,51 @@ class Goal:
         """
         raise NotImplementedError
 
+    def track(self, board: Block) -> int:
+        """Return the current score for this goal on <board>, and remember
+        what is needed to update that score incrementally with update_score as
+        moves are made on <board>.
+        """
+        raise NotImplementedError
+
+    def update_score(self, block: Block,
+                     action: Tuple[str, Optional[int]]) -> int:
+        """Update the score of the tracked board after <action> was
+        successfully performed on <block>, and return the change in score.
+
+        Only the unit cells covered by <block> are rescanned, so the cost
+        depends on the size of <block> rather than the size of the board.
+
+        Precondition:
+            - track has been called, and every successful move made on the
+              tracked board since then has been passed to update_score.
+            - <block> is the tracked board or one of its descendants.
+        """
+        raise NotImplementedError
+
+    def tracked_score(self) -> int:
+        """Return the score for this goal on the tracked board.
+
+        Precondition: track has been called.
+        """
+        return self._tracked_score
+
+    def cached_score(self, board: Block,
+                     cache: Optional[ScoreCache] = None) -> int:
+        """Return the current score for this goal on <board>, as score does,
+        but reuse the score stored in <cache> for an equal board if there is
+        one, and store it there otherwise.
+
+        If <cache> is None, SCORE_CACHE is used.
+        """
+        if cache is None:
+            cache = SCORE_CACHE
+        score = cache.lookup(board, self)
+        if score is None:
+            score = self.score(board)
+            cache.store(board, self, score)
+        return score
+
     def description(self) -> str:
         """Return a description of this goal.
         """
@@ -126,26 +338,71 @@ class PerimeterGoal(Goal):
     colour:
         The target colour for this goal, that is the colour to which
         this goal applies.
+
+    === Private Attributes ===
+    _edges:
+        The colours of the unit cells along the top, left, bottom and right
+        sides of the tracked board, in order of increasing column or row.
     """
     colour: Tuple[int, int, int]
+    _edges: List[List[Tuple[int, int, int]]]
+
+    def __init__(self, target_colour: Tuple[int, int, int]) -> None:
+        """Initialize this goal to have the given target colour.
+        """
+        Goal.__init__(self, target_colour)
+        self._edges = []
 
     def score(self, board: Block) -> int:
         """Return the current score for the perimeter goal on the given board.
 
         The score is always greater than or equal to 0.
+
+        Only the blocks along the edges of <board> are visited, so the cost
+        grows with the perimeter of the board rather than its area.
         """
-        flattened = _flatten(board)
-        score = 0
-        for x in range(len(flattened)):
-            if flattened[x][0] == self.colour:
-                score += 1
-            if flattened[x][len(flattened) - 1] == self.colour:
-                score += 1
-            if flattened[0][x] == self.colour:
-                score += 1
-            if flattened[len(flattened) - 1][x] == self.colour:
-                score += 1
-        return score
+        return sum(_edge_cells(board, self.colour, side) for side in range(4))
+
+    def track(self, board: Block) -> int:
+        """Return the current score for the perimeter goal on <board>, and
+        remember the colours along each side of <board> so that the score can
+        be updated with update_score.
+        """
+        width = 2 ** (board.max_depth - board.level)
+        self._board = board
+        self._edges = []
+        for side in range(4):
+            colours = [None] * width
+            _edge_colours(board, side, colours, 0)
+            self._edges.append(colours)
+        self._tracked_score = sum(colours.count(self.colour)
+                                  for colours in self._edges)
+        return self._tracked_score
+
+    def update_score(self, block: Block,
+                     action: Tuple[str, Optional[int]]) -> int:
+        """Update the score of the tracked board after <action> was
+        successfully performed on <block>, and return the change in score.
+
+        Only the segments of the perimeter that <block> lies along are
+        rescanned.
+        """
+        if action == PASS:
+            return 0
+        x, y = _cell_origin(self._board, block)
+        span = 2 ** (block.max_depth - block.level)
+        width = len(self._edges[0])
+        segments = [(0, y == 0, x), (1, x == 0, y),
+                    (2, y + span == width, x), (3, x + span == width, y)]
+        delta = 0
+        for side, touches, start in segments:
+            if touches:
+                colours = self._edges[side]
+                delta -= colours[start:start + span].count(self.colour)
+                _edge_colours(block, side, colours, start)
+                delta += colours[start:start + span].count(self.colour)
+        self._tracked_score += delta
+        return delta
 
     def description(self) -> str:
         """Return a precise string description of the perimeter goal and the
@@ -173,29 +430,161 @@ class BlobGoal(Goal):
     colour:
         The target colour for this goal, that is the colour to which
         this goal applies.
+
+    === Private Attributes ===
+    _grid:
+        The flattened tracked board.
+    _labels:
+        A parallel structure to <_grid> that contains, in each cell, the
+        label of the blob of the target colour that includes it, or 0 if the
+        cell is not of the target colour.
+    _blobs:
+        The number of unit cells in each blob of the target colour, by label.
+    _sizes:
+        A heap of (-size, label) pairs for the blobs that have been labelled.
+        Pairs for labels that are no longer in <_blobs> are discarded lazily.
+    _next_label:
+        The label to give the next blob that is found. Labels are never
+        reused.
     """
     colour: Tuple[int, int, int]
+    _grid: List[List[Tuple[int, int, int]]]
+    _labels: List[List[int]]
+    _blobs: Dict[int, int]
+    _sizes: List[Tuple[int, int]]
+    _next_label: int
+
+    def __init__(self, target_colour: Tuple[int, int, int]) -> None:
+        """Initialize this goal to have the given target colour.
+        """
+        Goal.__init__(self, target_colour)
+        self._grid = []
+        self._labels = []
+        self._blobs = {}
+        self._sizes = []
+        self._next_label = 1
 
     def score(self, board: Block) -> int:
         """Return the current score for blob goal on the given board.
 
         The score is always greater than or equal to 0.
         """
-        flattened = _flatten(board)
-        score = 0
-        visited = []
-        for _ in flattened:
-            row_visited = []
-            for _ in flattened[0]:
-                row_visited.append(-1)
-            visited.append(row_visited)
-        for col in range(len(flattened)):
-            for row in range(len(flattened[col])):
-                if visited[col][row] == -1:
-                    score = max(score, self._undiscovered_blob_size((col, row),
-                                                                    flattened,
-                                                                    visited))
-        return score
+        if _has_numpy():
+            return _largest_blob(board.to_grid() == colour_index(self.colour))
+        return _blob_sizes(_flatten(board)).get(self.colour, 0)
+
+    def track(self, board: Block) -> int:
+        """Return the current score for blob goal on <board>, and remember
+        the blobs of the target colour on <board> so that the score can be
+        updated with update_score.
+        """
+        self._board = board
+        self._grid = _flatten(board)
+        width = len(self._grid)
+        self._labels = [[0] * width for _ in range(width)]
+        self._blobs = {}
+        self._sizes = []
+        for col in range(width):
+            for row in range(width):
+                self._label_blob(col, row)
+        self._tracked_score = self._largest_tracked_blob()
+        return self._tracked_score
+
+    def update_score(self, block: Block,
+                     action: Tuple[str, Optional[int]]) -> int:
+        """Update the score of the tracked board after <action> was
+        successfully performed on <block>, and return the change in score.
+
+        Only the blobs that touch the unit cells of <block> are discarded and
+        labelled again.
+        """
+        if action == PASS:
+            return 0
+        x, y = _cell_origin(self._board, block)
+        span = 2 ** (block.max_depth - block.level)
+        width = len(self._grid)
+        cols = range(max(x - 1, 0), min(x + span + 1, width))
+        rows = range(max(y - 1, 0), min(y + span + 1, width))
+
+        # Discard every blob in or next to <block>, remembering its cells.
+        released = []
+        for col in cols:
+            for row in rows:
+                if self._labels[col][row] != 0:
+                    released.extend(self._release_blob(col, row))
+
+        grid = self._grid
+        labels = self._labels
+        block.flatten_into(grid, x, y)
+        for col, row in released:
+            if labels[col][row] == 0 and grid[col][row] == self.colour:
+                self._label_blob(col, row)
+        for col in range(x, x + span):
+            for row in range(y, y + span):
+                if labels[col][row] == 0 and grid[col][row] == self.colour:
+                    self._label_blob(col, row)
+
+        delta = self._largest_tracked_blob() - self._tracked_score
+        self._tracked_score += delta
+        return delta
+
+    def _label_blob(self, col: int, row: int) -> None:
+        """Give a new label to the blob of the target colour that includes
+        the cell at (<col>, <row>) of the tracked board, unless that cell is
+        already labelled or is not of the target colour.
+        """
+        grid = self._grid
+        labels = self._labels
+        if labels[col][row] != 0 or grid[col][row] != self.colour:
+            return
+        width = len(grid)
+        label = self._next_label
+        self._next_label += 1
+        labels[col][row] = label
+        size = 0
+        stack = [(col, row)]
+        while stack:
+            col, row = stack.pop()
+            size += 1
+            for c, r in ((col - 1, row), (col + 1, row), (col, row - 1),
+                         (col, row + 1)):
+                if 0 <= c < width and 0 <= r < width and labels[c][r] == 0 \
+                        and grid[c][r] == self.colour:
+                    labels[c][r] = label
+                    stack.append((c, r))
+        self._blobs[label] = size
+        heapq.heappush(self._sizes, (-size, label))
+
+    def _release_blob(self, col: int, row: int) -> List[Tuple[int, int]]:
+        """Remove the label of the blob that includes the labelled cell at
+        (<col>, <row>) of the tracked board, and return the cells of that blob.
+        """
+        labels = self._labels
+        width = len(labels)
+        label = labels[col][row]
+        labels[col][row] = 0
+        released = [(col, row)]
+        i = 0
+        while i < len(released):
+            col, row = released[i]
+            i += 1
+            for c, r in ((col - 1, row), (col + 1, row), (col, row - 1),
+                         (col, row + 1)):
+                if 0 <= c < width and 0 <= r < width and labels[c][r] == label:
+                    labels[c][r] = 0
+                    released.append((c, r))
+        del self._blobs[label]
+        return released
+
+    def _largest_tracked_blob(self) -> int:
+        """Return the number of unit cells in the largest blob of the target
+        colour on the tracked board.
+        """
+        while self._sizes and self._sizes[0][1] not in self._blobs:
+            heapq.heappop(self._sizes)
+        if not self._sizes:
+            return 0
+        return -self._sizes[0][0]
 
     def _undiscovered_blob_size(self, pos: Tuple[int, int],
                                 board: List[List[Tuple[int, int, int]]],
@@ -215,23 +604,26 @@ class BlobGoal(Goal):
                to be of the target colour
 
         Update <visited> so that all cells that are visited are marked with
-        either 0 or 1.
+        either 0 or 1. The blob is explored with an explicit stack rather than
+        recursion, so large blobs cannot exceed the recursion limit.
         """
-        col = pos[0]
-        row = pos[1]
-        if col < 0 or col >= len(board) or row < 0 or row >= len(board[0]):
-            return 0
-        elif visited[col][row] != -1:
-            return 0
-        elif board[col][row] != self.colour:
-            visited[col][row] = 0
-            return 0
-        visited[col][row] = 1
-        size = self._undiscovered_blob_size((col - 1, row), board, visited) + \
-               self._undiscovered_blob_size((col, row - 1), board, visited) + \
-               self._undiscovered_blob_size((col + 1, row), board, visited) + \
-               self._undiscovered_blob_size((col, row + 1), board, visited)
-        return size + 1
+        width = len(board)
+        height = len(board[0])
+        size = 0
+        stack = [pos]
+        while stack:
+            col, row = stack.pop()
+            if col < 0 or col >= width or row < 0 or row >= height or \
+                    visited[col][row] != -1:
+                continue
+            if board[col][row] != self.colour:
+                visited[col][row] = 0
+                continue
+            visited[col][row] = 1
+            size += 1
+            stack.extend([(col - 1, row), (col, row - 1), (col + 1, row),
+                          (col, row + 1)])
+        return size
 
     def description(self) -> str:
         """Return a precise string description of blob goal and the
@@ -244,12 +636,113 @@ class BlobGoal(Goal):
         return 'DESCRIPTION: ' + description
 
 
+class ScoreCache:
+    """A bounded transposition table of goal scores.
+
+    A score is stored under the structural hash and max_depth of the board it
+    was computed on, together with the type and colour of the goal, so any
+    sequence of moves that reaches an equal board finds it again. Once the
+    table holds <maxsize> scores, storing another evicts the least recently
+    used one.
+
+    === Public Attributes ===
+    maxsize:
+        The most scores this table holds.
+    hits:
+        The number of lookups that found a score.
+    misses:
+        The number of lookups that did not find a score.
+
+    === Private Attributes ===
+    _scores:
+        The stored scores, from least to most recently used.
+
+    === Representation Invariants ===
+    - maxsize > 0
+    - len(_scores) <= maxsize
+    """
+    maxsize: int
+    hits: int
+    misses: int
+    _scores: OrderedDict
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize this table to hold at most <maxsize> scores, with no
+        scores stored.
+
+        >>> cache = ScoreCache(2)
+        >>> goal = PerimeterGoal(COLOUR_LIST[0])
+        >>> board = Block((0, 0), 750, COLOUR_LIST[0], 0, 1)
+        >>> cache.lookup(board, goal) is None
+        True
+        >>> cache.store(board, goal, 8)
+        >>> cache.lookup(board, goal)
+        8
+        >>> cache.hits, cache.misses
+        (1, 1)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of scores stored in this table.
+        """
+        return len(self._scores)
+
+    def lookup(self, board: Block, goal: Goal) -> Optional[int]:
+        """Return the score stored for <goal> on a board equal to <board>, or
+        None if there is none.
+        """
+        key = _score_key(board, goal)
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._scores.move_to_end(key)
+        return score
+
+    def store(self, board: Block, goal: Goal, score: int) -> None:
+        """Store <score> as the score for <goal> on <board>.
+        """
+        key = _score_key(board, goal)
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.maxsize:
+            self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every score from this table and reset its counters.
+        """
+        self._scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _score_key(board: Block, goal: Goal) -> Tuple[Hashable, ...]:
+    """Return the key under which ScoreCache stores the score for <goal> on
+    <board>.
+
+    The max_depth is part of the key because the structural hash only
+    describes the levels of the blocks, and a perimeter score also depends on
+    how many unit cells each block spans.
+    """
+    return board.structural_hash(), board.max_depth, type(goal), goal.colour
+
+
+# The transposition table used by Goal.cached_score and SmartPlayer.
+SCORE_CACHE = ScoreCache(2 ** 16)
+
+
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'block', 'settings',
-            'math', '__future__'
+            'math', '__future__', 'numpy', 'heapq', 'actions', 'collections',
+            'functools', 'importlib.util'
         ],
         'max-attributes': 15
     })
@@ -0,0 +1,422 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the LinearBoard class, a board engine that stores the
+Blocky quadtree in flat arrays instead of linked Block objects.
+"""
+from __future__ import annotations
+from array import array
+import struct
+from typing import List, Optional, Tuple
+
+from block import Block
+from settings import colour_index, COLOUR_LIST
+
+# The colour index stored for a block that has children.
+_INTERNAL = 255
+
+# The Block child index stored in each of the four child slots of a node, so
+# that children are stored in Morton (Z) order: upper-left, upper-right,
+# lower-left, lower-right.
+_MORTON = (1, 0, 2, 3)
+
+# The header of a serialized board: its x and y position, size, the level of
+# its root and its max_depth.
+_HEADER = struct.Struct('<IIIBB')
+
+# For each move, the Block child index that ends up at each Block child index.
+_ROTATIONS = {1: (1, 2, 3, 0), 3: (3, 0, 1, 2)}
+_SWAPS = {0: (1, 0, 3, 2), 1: (3, 2, 1, 0)}
+
+
+class LinearBoard:
+    """A Blocky board stored as a linear quadtree.
+
+    The blocks of the board are numbered in preorder, with the children of
+    each block in Morton order, so every subtree occupies a contiguous run of
+    nodes. A node is referred to by its index in that order, and the root is
+    node 0. Copying a board copies three flat arrays.
+
+    === Public Attributes ===
+    position:
+        The (x, y) coordinates of the upper left corner of the board.
+    size:
+        The height and width of the board.
+    max_depth:
+        The deepest level allowed in the board.
+
+    === Private Attributes ===
+    _colours:
+        The index in COLOUR_LIST of the colour of each node, or _INTERNAL if
+        the node has children.
+    _levels:
+        The level of each node.
+    _spans:
+        The number of nodes in the subtree rooted at each node, so that the
+        next sibling of node i is node i + _spans[i].
+
+    === Representation Invariants ===
+    - len(_colours) == len(_levels) == len(_spans)
+    - A node with colour _INTERNAL is followed by its four children's
+      subtrees, and its span is one more than the sum of theirs.
+    - Every other node is a leaf with a span of 1.
+    """
+    position: Tuple[int, int]
+    size: int
+    max_depth: int
+    _colours: array
+    _levels: array
+    _spans: array
+
+    def __init__(self, position: Tuple[int, int], size: int,
+                 max_depth: int) -> None:
+        """Initialize this board with <position>, dimensions <size> by <size>
+        and <max_depth>, and with no nodes.
+
+        Use from_block or copy to create a board that has nodes.
+        """
+        self.position = position
+        self.size = size
+        self.max_depth = max_depth
+        self._colours = array('B')
+        self._levels = array('B')
+        self._spans = array('I')
+
+    @staticmethod
+    def from_block(block: Block) -> LinearBoard:
+        """Return a LinearBoard with the same position, size, colours and
+        structure as <block>.
+
+        Precondition: the colour of every leaf in <block> is in COLOUR_LIST.
+        """
+        board = LinearBoard(block.position, block.size, block.max_depth)
+        colours, levels, spans = _segment(block)
+        board._colours.extend(colours)
+        board._levels.extend(levels)
+        board._spans.extend(spans)
+        return board
+
+    def to_block(self) -> Block:
+        """Return a new Block with the same position, size, colours and
+        structure as this board.
+        """
+        return self._to_block(0, self.position, self.size)
+
+    def _to_block(self, node: int, position: Tuple[int, int],
+                  size: int) -> Block:
+        """Return a new Block for the subtree rooted at <node>, whose upper
+        left corner is at <position> and whose dimensions are <size> by
+        <size>.
+        """
+        block = Block(position, size, self.colour(node), self._levels[node],
+                      self.max_depth)
+        if self._colours[node] == _INTERNAL:
+            positions = block._children_positions()
+            child_size = block._child_size()
+            for i, child in enumerate(self.children(node)):
+                child_block = self._to_block(child, positions[i], child_size)
+                child_block._parent = block
+                block.children.append(child_block)
+        return block
+
+    def copy(self) -> LinearBoard:
+        """Return a copy of this board.
+        """
+        board = LinearBoard(self.position, self.size, self.max_depth)
+        board._colours = array('B', self._colours)
+        board._levels = array('B', self._levels)
+        board._spans = array('I', self._spans)
+        return board
+
+    def serialize(self) -> bytes:
+        """Return this board as bytes, which deserialize turns back into an
+        equal board.
+
+        Only the colour of each node is stored, one byte per node, since the
+        levels and spans follow from which nodes are internal.
+        """
+        return _HEADER.pack(self.position[0], self.position[1], self.size,
+                            self._levels[0], self.max_depth) + \
+            self._colours.tobytes()
+
+    @staticmethod
+    def deserialize(data: bytes) -> LinearBoard:
+        """Return the board that serialize turned into <data>.
+
+        >>> block = Block((0, 0), 750, COLOUR_LIST[0], 0, 1)
+        >>> block.smash()
+        True
+        >>> board = LinearBoard.from_block(block)
+        >>> LinearBoard.deserialize(board.serialize()).to_block() == block
+        True
+        """
+        x, y, size, level, max_depth = _HEADER.unpack_from(data)
+        board = LinearBoard((x, y), size, max_depth)
+        board._colours.frombytes(data[_HEADER.size:])
+        board._levels.extend([0] * len(board._colours))
+        board._spans.extend([1] * len(board._colours))
+        # The internal nodes whose subtrees are still being read, each with
+        # the number of its children that have not been reached yet.
+        stack = []
+        for node, colour in enumerate(board._colours):
+            board._levels[node] = level + len(stack)
+            if stack:
+                stack[-1][1] -= 1
+            if colour == _INTERNAL:
+                stack.append([node, 4])
+            else:
+                while stack and stack[-1][1] == 0:
+                    parent = stack.pop()[0]
+                    board._spans[parent] = node + 1 - parent
+        return board
+
+    def __len__(self) -> int:
+        """Return the number of nodes in this board.
+        """
+        return len(self._colours)
+
+    def colour(self, node: int) -> Optional[Tuple[int, int, int]]:
+        """Return the colour of <node>, or None if it has children.
+        """
+        if self._colours[node] == _INTERNAL:
+            return None
+        return COLOUR_LIST[self._colours[node]]
+
+    def level(self, node: int) -> int:
+        """Return the level of <node>.
+        """
+        return self._levels[node]
+
+    def children(self, node: int) -> List[int]:
+        """Return the children of <node>, in the same order as the children of
+        a Block, or an empty list if <node> is a leaf.
+        """
+        if self._colours[node] != _INTERNAL:
+            return []
+        slots = []
+        child = node + 1
+        for _ in range(4):
+            slots.append(child)
+            child += self._spans[child]
+        return [slots[_MORTON[i]] for i in range(4)]
+
+    def block_at(self, location: Tuple[int, int], level: int) -> Optional[int]:
+        """Return the node at <level> that includes <location>, like
+        player._get_block does for a Block.
+
+        If <level> is greater than the level of the deepest node that includes
+        <location>, return that deepest node. If no node includes <location>,
+        return None.
+        """
+        x, y = self.position
+        size = self.size
+        if not (x <= location[0] < x + size and y <= location[1] < y + size):
+            return None
+        node = 0
+        while self._levels[node] < level and self._colours[node] == _INTERNAL:
+            half = round(size / 2.0)
+            right = location[0] >= x + half
+            lower = location[1] >= y + half
+            slot = 2 * lower + right
+            node += 1
+            for _ in range(slot):
+                node += self._spans[node]
+            x += half * right
+            y += half * lower
+            size = half
+        return node
+
+    def flatten(self) -> List[List[Tuple[int, int, int]]]:
+        """Return the unit cells of this board as a list of columns, in the
+        same form as goal._flatten returns for a Block.
+
+        The nodes are scanned once, in order, with an explicit stack.
+        """
+        width = 2 ** self.max_depth
+        grid = [[None] * width for _ in range(width)]
+        stack = [(0, 0, width)]
+        for node in range(len(self._colours)):
+            x, y, span = stack.pop()
+            if self._colours[node] == _INTERNAL:
+                half = span // 2
+                # Push the children in reverse Morton order.
+                stack.extend([(x + half, y + half, half), (x, y + half, half),
+                              (x + half, y, half), (x, y, half)])
+            else:
+                column = [COLOUR_LIST[self._colours[node]]] * span
+                for i in range(x, x + span):
+                    grid[i][y:y + span] = column
+        return grid
+
+    def smash(self, node: int) -> bool:
+        """Sub-divide <node> into four randomly generated children, as
+        Block.smash does, and return True iff the smash was performed.
+        """
+        level = self._levels[node]
+        if level == self.max_depth or self._colours[node] == _INTERNAL:
+            return False
+        block = Block((0, 0), 2 ** (self.max_depth - level),
+                      self.colour(node), level, self.max_depth)
+        block.smash()
+        self._replace(node, _segment(block))
+        return True
+
+    def combine(self, node: int) -> bool:
+        """Turn <node> into a leaf of the majority colour of its children, as
+        Block.combine does, and return True iff it was combined.
+        """
+        if self._levels[node] != self.max_depth - 1 or \
+                self._colours[node] != _INTERNAL:
+            return False
+        colours = list(self._colours[node + 1:node + 5])
+        counts = [colours.count(colour) for colour in colours]
+        if not (3 in counts or 4 in counts or counts.count(2) == 2):
+            return False
+        majority = colours[counts.index(max(counts))]
+        self._replace(node, ([majority], [self._levels[node]], [1]))
+        return True
+
+    def paint(self, node: int, colour: Tuple[int, int, int]) -> bool:
+        """Change the colour of <node> iff it is a leaf at a level of max_depth
+        and its colour is different from <colour>, and return True iff it was
+        changed.
+        """
+        index = colour_index(colour)
+        if self._levels[node] != self.max_depth or \
+                self._colours[node] in (_INTERNAL, index):
+            return False
+        self._colours[node] = index
+        return True
+
+    def swap(self, node: int, direction: int) -> bool:
+        """Swap the children of <node> vertically if <direction> is 1, or
+        horizontally if <direction> is 0, and return True iff it was swapped.
+        """
+        if self._colours[node] != _INTERNAL:
+            return False
+        self._rearrange(node, _SWAPS[direction], None)
+        return True
+
+    def rotate(self, node: int, direction: int) -> bool:
+        """Rotate <node> and all its descendants clockwise if <direction> is
+        1, or counter-clockwise if <direction> is 3, and return True iff it was
+        rotated.
+        """
+        if self._colours[node] != _INTERNAL:
+            return False
+        self._rearrange(node, _ROTATIONS[direction], direction)
+        return True
+
+    def _rearrange(self, node: int, order: Tuple[int, int, int, int],
+                   direction: Optional[int]) -> None:
+        """Reorder the children of <node> so that Block child index i holds
+        the child that was at Block child index order[i].
+
+        If <direction> is not None, also rotate every descendant in that
+        direction. The subtree keeps its size, so only its run of nodes is
+        rewritten.
+        """
+        end = node + self._spans[node]
+        self._colours[node:end], self._levels[node:end], \
+            self._spans[node:end] = [array(typecode, values) for
+                                     typecode, values in
+                                     zip('BBI', self._rearranged(node, order,
+                                                                 direction))]
+
+    def _rearranged(self, node: int, order: Tuple[int, int, int, int],
+                    direction: Optional[int]) \
+            -> Tuple[List[int], List[int], List[int]]:
+        """Return the colours, levels and spans of the subtree rooted at
+        <node> after its children are reordered as described in _rearrange.
+        """
+        colours = [self._colours[node]]
+        levels = [self._levels[node]]
+        spans = [self._spans[node]]
+        children = self.children(node)
+        for slot in range(4):
+            child = children[order[_MORTON[slot]]]
+            if direction is not None and self._colours[child] == _INTERNAL:
+                segment = self._rearranged(child, _ROTATIONS[direction],
+                                           direction)
+            else:
+                end = child + self._spans[child]
+                segment = (self._colours[child:end], self._levels[child:end],
+                           self._spans[child:end])
+            colours.extend(segment[0])
+            levels.extend(segment[1])
+            spans.extend(segment[2])
+        return colours, levels, spans
+
+    def _replace(self, node: int,
+                 segment: Tuple[List[int], List[int], List[int]]) -> None:
+        """Replace the subtree rooted at <node> with the nodes in <segment>,
+        and update the spans of the ancestors of <node>.
+        """
+        end = node + self._spans[node]
+        change = len(segment[0]) - (end - node)
+        for ancestor in self._ancestors(node):
+            self._spans[ancestor] += change
+        self._colours[node:end] = array('B', segment[0])
+        self._levels[node:end] = array('B', segment[1])
+        self._spans[node:end] = array('I', segment[2])
+
+    def _ancestors(self, node: int) -> List[int]:
+        """Return the ancestors of <node>, from the root down.
+        """
+        ancestors = []
+        current = 0
+        while current != node:
+            ancestors.append(current)
+            child = current + 1
+            while child + self._spans[child] <= node:
+                child += self._spans[child]
+            current = child
+        return ancestors
+
+
+def _segment(block: Block) -> Tuple[List[int], List[int], List[int]]:
+    """Return the colour indices, levels and spans of the nodes of <block> in
+    preorder, with the children of each node in Morton order.
+    """
+    if not block.children:
+        return [colour_index(block.colour)], [block.level], [1]
+    colours = [_INTERNAL]
+    levels = [block.level]
+    spans = [0]
+    for slot in range(4):
+        child = _segment(block.children[_MORTON[slot]])
+        colours.extend(child[0])
+        levels.extend(child[1])
+        spans.extend(child[2])
+    spans[0] = len(colours)
+    return colours, levels, spans
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'array', 'block',
+            'settings', 'struct'
+        ],
+        'max-attributes': 15
+    })
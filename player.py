@@ -22,15 +22,26 @@ Misha Schwartz, and Jaisie Sin.
 This file contains the hierarchy of player classes.
 """
 from __future__ import annotations
-from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type, \
+    TYPE_CHECKING
+import heapq
+import math
+import os
 import random
-import pygame
+import time
 
-from block import Block
-from goal import Goal, generate_goals
+from block import Block, undo_move
+from goal import Goal, generate_goals, SCORE_CACHE
+from linear_board import LinearBoard
 
-from actions import KEY_ACTION, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
+
+# pygame is only needed to handle events, which is done by the controls module,
+# so it is never loaded when the game is simulated without a display.
+if TYPE_CHECKING:
+    import pygame
 
 
 def create_players(num_human: int, num_random: int, smart_players: List[int]) \
@@ -64,6 +75,11 @@ def create_players(num_human: int, num_random: int, smart_players: List[int]) \
     return players
 
 
+# The index of the child of a Block that covers each quadrant, by whether the
+# quadrant is in the lower half and whether it is in the right half.
+_QUADRANT_CHILD = ((1, 0), (2, 3))
+
+
 def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
         Optional[Block]:
     """Return the Block within <block> that is at <level> and includes
@@ -79,21 +95,28 @@ def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
 
     If no Block can be found at <location>, return None.
 
+    The quadrant that includes <location> is computed at each level, so only
+    the blocks on the way down to the result are visited.
+
     Preconditions:
         - 0 <= level <= max_depth
     """
-    if not (block.position[0] <= location[0] < (block.position[0] + block.size)
-            and block.position[1] <= location[1] < (block.position[1] +
-                                                    block.size)):
+    x, y = block.position
+    size = block.size
+    if not (x <= location[0] < x + size and y <= location[1] < y + size) or \
+            level < block.level:
         return None
-    if block.level == level or (block.level < level and not block.children):
-        return block
-    else:
-        target = None
-        for child in block.children:
-            if _get_block(child, location, level) is not None:
-                target = _get_block(child, location, level)
-        return target
+    while block.level < level and block.children:
+        size = round(size / 2.0)
+        right = location[0] >= x + size
+        lower = location[1] >= y + size
+        block = block.children[_QUADRANT_CHILD[lower][right]]
+        x += size * right
+        y += size * lower
+        # Rounding can leave a gap between a child and the edge of its parent.
+        if location[0] >= x + size or location[1] >= y + size:
+            return None
+    return block
 
 
 def _get_random_block(player: Player, board: Block) -> Block:
@@ -121,28 +144,56 @@ def _get_valid_actions(player: Player, board: Block) -> \
         List[Tuple[str, Optional[int]]]:
     """Return a list of tuples representing the valid actions that <player> can
     perform on <board>.
+
+    The legality of each action is checked with the predicates of <board>,
+    so <board> is neither copied nor mutated.
     """
     valid_move = []
-    for action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, SWAP_HORIZONTAL,
-                   SWAP_VERTICAL, SMASH, PAINT, COMBINE]:
-        copy_board = board.create_copy()
-        successful = False
-        if action == PAINT:
-            successful = copy_board.paint(player.goal.colour)
-        elif action == COMBINE:
-            successful = copy_board.combine()
-        elif action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-            successful = copy_board.rotate(action[1])
-        elif action in [SWAP_VERTICAL, SWAP_HORIZONTAL]:
-            successful = copy_board.swap(action[1])
-        elif action == SMASH:
-            successful = copy_board.smash()
-
-        if successful:
-            valid_move.append(action)
+    if board.can_rotate():
+        valid_move.extend([ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE])
+    if board.can_swap():
+        valid_move.extend([SWAP_HORIZONTAL, SWAP_VERTICAL])
+    if board.smashable():
+        valid_move.append(SMASH)
+    if board.can_paint(player.goal.colour):
+        valid_move.append(PAINT)
+    if board.can_combine():
+        valid_move.append(COMBINE)
     return valid_move
 
 
+def _enumerate_moves(player: Player, board: Block) -> \
+        Iterator[Tuple[Block, Tuple[str, Optional[int]]]]:
+    """Yield each valid move that <player> can make on <board> exactly once,
+    as a pair of the block to act on and the action.
+
+    The blocks are visited in preorder, children in order, and the actions of
+    each block are yielded in the order _get_valid_actions returns them. No
+    list of moves is built, so a caller can stop at any point.
+
+    The caller may perform a yielded move on <board> as long as it reverts
+    the move before asking for the next one.
+    """
+    colour = player.goal.colour
+    stack = [board]
+    while stack:
+        block = stack.pop()
+        children = block.children
+        if children:
+            stack.extend(reversed(children))
+            yield block, ROTATE_CLOCKWISE
+            yield block, ROTATE_COUNTER_CLOCKWISE
+            yield block, SWAP_HORIZONTAL
+            yield block, SWAP_VERTICAL
+            if block.can_combine():
+                yield block, COMBINE
+        else:
+            if block.smashable():
+                yield block, SMASH
+            if block.can_paint(colour):
+                yield block, PAINT
+
+
 class Player:
     """A player in the Blocky game.
 
@@ -175,6 +226,12 @@ class Player:
         """
         raise NotImplementedError
 
+    def request_move(self) -> None:
+        """Ask this player to choose a move on its next call to generate_move,
+        as a mouse click does for a computer player.
+        """
+        raise NotImplementedError
+
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
         """Return a potential move to make on the game board.
@@ -236,25 +293,32 @@ class HumanPlayer(Player):
 
         If no block is selected by the player, return None.
         """
-        mouse_pos = pygame.mouse.get_pos()
+        from controls import mouse_position
+
+        mouse_pos = mouse_position()
         block = _get_block(board, mouse_pos, min(self._level, board.max_depth))
 
         return block
 
     def process_event(self, event: pygame.event.Event) -> None:
         """Respond to the relevant keyboard events made by the player based on
-        the mapping in KEY_ACTION, as well as the W and S keys for changing
-        the level.
-        """
-        if event.type == pygame.KEYDOWN:
-            if event.key in KEY_ACTION:
-                self._desired_action = KEY_ACTION[event.key]
-            elif event.key == pygame.K_w:
-                self._level = max(0, self._level - 1)
-                self._desired_action = None
-            elif event.key == pygame.K_s:
-                self._level += 1
-                self._desired_action = None
+        the mapping in controls.KEY_ACTION, as well as the W and S keys for
+        changing the level.
+        """
+        from controls import key_action, key_level
+
+        action = key_action(event)
+        change = key_level(event)
+        if action is not None:
+            self._desired_action = action
+        elif change != 0:
+            self._level = max(0, self._level + change)
+            self._desired_action = None
+
+    def request_move(self) -> None:
+        """Do nothing, since a HumanPlayer chooses its moves from the user's
+        input.
+        """
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -306,8 +370,16 @@ class RandomPlayer(Player):
         """Communicates that the RandomPlayer should make a move by setting
         _proceed to True iff the user clicks their mouse.
         """
-        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            self._proceed = True
+        from controls import is_click
+
+        if is_click(event):
+            self.request_move()
+
+    def request_move(self) -> None:
+        """Ask this RandomPlayer to choose a move on its next call to
+        generate_move, by setting _proceed to True.
+        """
+        self._proceed = True
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -336,28 +408,45 @@ class SmartPlayer(Player):
     what its score would be if it were to make that move. Then it picks the one
     that yields the best score.
 
+    === Public Attributes ===
+    evaluated:
+        The number of candidate moves scored on this player's last turn.
+
     === Private Attributes ===
     _proceed:
         True when the player should make a move, False when the player should
     wait.
     _difficulty:
         A level which indicates how difficult it is to play against it.
+    _budget:
+        The number of seconds this player may spend choosing each move, or
+        None if it scores <_difficulty> moves whatever the time.
 
     == Representation Invariants concerning the private attributes ==
         _difficulty >= 0
+        _budget is None or _budget > 0
     """
     id: int
     goal: Goal
+    evaluated: int
     _proceed: bool
     _difficulty: int
+    _budget: Optional[float]
 
-    def __init__(self, player_id: int, goal: Goal, difficulty: int) -> None:
+    def __init__(self, player_id: int, goal: Goal, difficulty: int,
+                 budget: Optional[float] = None) -> None:
         """Initialize this SmartPlayer with the given <player_id>, <goal>,
         and <difficulty>.
+
+        If <budget> is not None, this player instead keeps scoring candidate
+        moves until <budget> seconds have passed since it started choosing
+        its move, however many that is.
         """
         Player.__init__(self, player_id, goal)
         self._difficulty = difficulty
+        self._budget = budget
         self._proceed = False
+        self.evaluated = 0
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         """Return the block on <board> that is currently selected by the
@@ -372,8 +461,16 @@ class SmartPlayer(Player):
         """Communicates that the SmartPlayer should make a move by setting
         _proceed to True iff the user clicks their mouse.
         """
-        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            self._proceed = True
+        from controls import is_click
+
+        if is_click(event):
+            self.request_move()
+
+    def request_move(self) -> None:
+        """Ask this SmartPlayer to choose a move on its next call to
+        generate_move, by setting _proceed to True.
+        """
+        self._proceed = True
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -385,50 +482,773 @@ class SmartPlayer(Player):
         performed on the <board>. If no move can be found that is better than
         the current score, this player will pass.
 
-        This function does not mutate <board>.
+        Each candidate move is performed on <board>, scored incrementally, and
+        then reverted, so <board> is never copied and is unchanged when this
+        function returns. A candidate that leads to a board already scored,
+        on this turn or an earlier one, reuses the score in SCORE_CACHE.
         """
         if not self._proceed:
             return None  # Do not remove
         self._proceed = False  # Must set to False before returning!
+        if self._budget is None:
+            improved, best_move, best_block = \
+                self._search(board, self._difficulty)
+        else:
+            deadline = time.perf_counter() + self._budget
+            improved, best_move, best_block = \
+                self._search(board, None, deadline)
+
+        if improved == 0:
+            return _create_move(PASS, board)
+        else:
+            return _create_move(best_move, best_block)
+
+    def _search(self, board: Block, count: Optional[int],
+                deadline: Optional[float] = None) -> \
+            Tuple[int, Optional[Tuple[str, Optional[int]]], Optional[Block]]:
+        """Score <count> random valid moves on <board>, and return the best
+        improvement in score among them, with the action and block of the
+        first move that makes it.
+
+        If <deadline> is not None, stop scoring moves before time.perf_counter
+        reaches it, and if <count> is None, score moves until then. A move is
+        only started if the slowest move so far would still finish in time.
+        Record the number of moves scored in <evaluated>.
+
+        If no move improves the score, return 0 and no action or block.
+        """
         improved = 0
         best_move = None
         best_block = None
-        score = self.goal.score(board)
-        all_actions = [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,
-                       SWAP_VERTICAL, SWAP_HORIZONTAL, PAINT, COMBINE, SMASH]
-
-        for _ in range(self._difficulty):
-            copy_board = board.create_copy()
-            selected_block = _get_random_block(self, copy_board)
+        # Score the candidates with a goal of our own, so that tracking
+        # <board> here leaves the score tracked by self.goal untouched.
+        scorer = type(self.goal)(self.goal.colour)
+        current = scorer.track(board)
+        log = []
+        self.evaluated = 0
+        now = time.perf_counter()
+        slowest = 0.0
+
+        while (count is None or self.evaluated < count) and \
+                (deadline is None or now + slowest < deadline):
+            self.evaluated += 1
+            selected_block = _get_random_block(self, board)
             valid_actions = _get_valid_actions(self, selected_block)
             if not valid_actions:
                 rand_action = PASS
             else:
                 rand_action = random.choice(valid_actions)
-                while rand_action not in valid_actions:
-                    rand_action = random.choice(all_actions)
-            if rand_action == PAINT:
-                selected_block.paint(self.goal.colour)
-            elif rand_action == COMBINE:
-                selected_block.combine()
-            elif rand_action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-                selected_block.rotate(rand_action[1])
-            elif rand_action in [SWAP_VERTICAL, SWAP_HORIZONTAL]:
-                selected_block.swap(rand_action[1])
-            elif rand_action == SMASH:
-                selected_block.smash()
-
-            if self.goal.score(copy_board) - score > improved:
-                improved = self.goal.score(copy_board) - score
+            selected_block.perform(rand_action, self.goal.colour, log)
+            score = SCORE_CACHE.lookup(board, scorer)
+            if score is None:
+                score = current + scorer.update_score(selected_block,
+                                                      rand_action)
+                SCORE_CACHE.store(board, scorer, score)
+                undo_move(log)
+                scorer.update_score(selected_block, rand_action)
+            else:
+                # The scorer was not told about the move, so it needs no
+                # update once the move is reverted.
+                undo_move(log)
+            change = score - current
+
+            if change > improved:
+                improved = change
                 best_move = rand_action
                 best_block = selected_block
+            finished = time.perf_counter()
+            slowest = max(slowest, finished - now)
+            now = finished
 
-        if improved == 0:
-            return _create_move(PASS, board)
+        return improved, best_move, best_block
+
+
+# The number of candidate moves in each chunk that a ParallelSmartPlayer
+# hands to a worker. The chunks depend only on the difficulty, never on the
+# number of workers, so the move chosen depends only on the seed.
+_CHUNK_SIZE = 64
+
+
+class ParallelSmartPlayer(SmartPlayer):
+    """A smart player that scores its random candidate moves in a pool of
+    worker processes.
+
+    Each turn, the board is serialized once for each worker, and the
+    candidates are split into chunks of _CHUNK_SIZE. Chunk i is generated
+    from a seed derived from the turn's seed and i, and the best move of the
+    earliest chunk wins ties, so the move chosen for a given seed is the same
+    however many workers there are and however they are scheduled. For the
+    same reason, it always scores <_difficulty> moves and has no time budget.
+
+    === Private Attributes ===
+    _processes:
+        The number of worker processes.
+    _random:
+        The source of the seed for each turn: a random.Random seeded by the
+        seed this player was given, or the random module itself.
+    _executor:
+        The pool of worker processes, or None if it has not been started or
+        has been closed.
+
+    == Representation Invariants concerning the private attributes ==
+        _processes >= 1
+    """
+    _processes: int
+    _random: random.Random
+    _executor: Optional[ProcessPoolExecutor]
+
+    def __init__(self, player_id: int, goal: Goal, difficulty: int,
+                 processes: Optional[int] = None,
+                 seed: Optional[int] = None) -> None:
+        """Initialize this ParallelSmartPlayer with the given <player_id>,
+        <goal> and <difficulty>, to use <processes> worker processes, or one
+        for each CPU if <processes> is None.
+
+        If <seed> is None, the seed for each turn is drawn from the random
+        module instead.
+        """
+        SmartPlayer.__init__(self, player_id, goal, difficulty)
+        self._processes = processes or os.cpu_count() or 1
+        self._random = random.Random(seed) if seed is not None else random
+        self._executor = None
+
+    def close(self) -> None:
+        """Shut down the worker processes of this player, if they have been
+        started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _search(self, board: Block, count: Optional[int],
+                deadline: Optional[float] = None) -> \
+            Tuple[int, Optional[Tuple[str, Optional[int]]], Optional[Block]]:
+        """Score <count> random valid moves on <board> in the worker
+        processes, and return the best improvement in score among them, with
+        the action and block of the move that makes it.
+
+        If no move improves the score, return 0 and no action or block.
+
+        Precondition: <count> is not None and <deadline> is None.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._processes)
+        data = LinearBoard.from_block(board).serialize()
+        seed = self._random.getrandbits(64)
+        chunks = [(i, min(_CHUNK_SIZE, count - start))
+                  for i, start in enumerate(range(0, count, _CHUNK_SIZE))]
+        futures = [self._executor.submit(_search_chunks, data,
+                                         type(self.goal), self.goal.colour,
+                                         chunks[i::self._processes], seed)
+                   for i in range(min(self._processes, len(chunks)))]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+        self.evaluated = count
+
+        improved, best_move, best_location = 0, None, None
+        for i in range(len(chunks)):
+            change, action, location = results[i]
+            if change > improved:
+                improved, best_move, best_location = change, action, location
+        if best_location is None:
+            return 0, None, None
+        return improved, best_move, _get_block(board, *best_location)
+
+
+def _search_chunks(data: bytes, goal_type: Type[Goal],
+                   colour: Tuple[int, int, int],
+                   chunks: Sequence[Tuple[int, int]], seed: int) -> \
+        Dict[int, Tuple[int, Optional[Tuple[str, Optional[int]]],
+                        Optional[Tuple[Tuple[int, int], int]]]]:
+    """Search each chunk in <chunks> on the board serialized as <data>, for a
+    goal of <goal_type> and <colour>, and return the result of each chunk.
+
+    Each chunk is a pair of its index and its number of candidates, and is
+    searched with the random module seeded by <seed> and its index. Its
+    result is the best improvement in score, with the action of that move
+    and the position and level of its block, which identify the block on the
+    original board.
+
+    This runs in a worker process of a ParallelSmartPlayer.
+    """
+    # The board must be linked, so that SCORE_CACHE, which this worker keeps
+    # between chunks, is keyed by hashes that follow each candidate move.
+    board = LinearBoard.deserialize(data).to_block()
+    player = SmartPlayer(0, goal_type(colour), 0)
+    results = {}
+    for index, count in chunks:
+        random.seed(seed + index)
+        improved, action, block = player._search(board, count)
+        location = None if block is None else (block.position, block.level)
+        results[index] = improved, action, location
+    return results
+
+
+# A move in an MCTSPlayer's search tree: the position and level of the block
+# to act on, and the action. Blocks are found again by position, since a
+# smash creates new blocks each time it is performed.
+_TreeMove = Tuple[Tuple[int, int], int, Tuple[str, Optional[int]]]
+
+# The weight of exploration against exploitation in UCT selection.
+_EXPLORATION = 1.4
+
+# A node visited n times may have at most _WIDENING * sqrt(n) children, so
+# that boards with thousands of moves are not expanded one move at a time.
+_WIDENING = 2.0
+
+# The most moves of a simulation that follow the search tree, and the number
+# of random moves that follow them.
+_HORIZON = 4
+_ROLLOUT = 2
+
+# The number of moves below the kept subtree of an MCTSPlayer's search tree
+# that are searched for the board at the start of its next turn, since the
+# other players' moves may be ones the tree has already tried.
+_REROOT = 2
+
+
+class _SearchNode:
+    """A board reached by a sequence of moves in an MCTSPlayer's search tree.
+
+    === Public Attributes ===
+    visits:
+        The number of simulations that passed through this node.
+    total:
+        The sum of the rewards of those simulations.
+    children:
+        The nodes reached by each move from this node that has been tried.
+    board_hash:
+        The structural hash of the board at this node when it was created.
+    """
+    visits: int
+    total: float
+    children: Dict[_TreeMove, _SearchNode]
+    board_hash: int
+
+    def __init__(self, board_hash: int) -> None:
+        """Initialize this node with no visits and no children, for a board
+        with structural hash <board_hash>.
+        """
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}
+        self.board_hash = board_hash
+
+
+class MCTSPlayer(Player):
+    """A computer player that chooses moves by Monte Carlo tree search.
+
+    Each simulation follows the search tree from the current board by UCT
+    selection, adds one new move to the tree, and then makes a few random
+    moves. Its reward is the best that the player's goal score minus the
+    penalties in ACTION_PENALTY reached along the way, compared to the current
+    score, since the player can pass once it is ahead. The moves of the
+    other players are not modelled.
+
+    The move played is the most visited move from the current board, or PASS
+    if its average reward is not positive. The subtree below that move, or
+    the whole tree after a PASS, is kept. On the next turn, the search
+    resumes from the node of that subtree, at most _REROOT moves below it,
+    whose board is the same as the current board, if there is one.
+
+    === Public Attributes ===
+    evaluated:
+        The number of simulations run on this player's last turn.
+
+    === Private Attributes ===
+    _proceed:
+        True when the player should make a move, False when the player should
+    wait.
+    _iterations:
+        The number of simulations to run each turn.
+    _budget:
+        The number of seconds this player may spend choosing each move, or
+        None if it runs <_iterations> simulations whatever the time.
+    _root:
+        The search tree for the board this player's last move led to, or
+        None.
+    _low, _high:
+        The lowest and highest rewards seen on this turn, which scale rewards
+        into [0, 1] for UCT selection.
+
+    == Representation Invariants concerning the private attributes ==
+        _iterations >= 0
+        _budget is None or _budget > 0
+    """
+    id: int
+    goal: Goal
+    evaluated: int
+    _proceed: bool
+    _iterations: int
+    _budget: Optional[float]
+    _root: Optional[_SearchNode]
+    _low: float
+    _high: float
+
+    def __init__(self, player_id: int, goal: Goal, iterations: int,
+                 budget: Optional[float] = None) -> None:
+        """Initialize this MCTSPlayer with the given <player_id> and <goal>,
+        to run <iterations> simulations each turn.
+
+        If <budget> is not None, this player instead keeps running
+        simulations until <budget> seconds have passed since it started
+        choosing its move, however many that is.
+        """
+        Player.__init__(self, player_id, goal)
+        self._iterations = iterations
+        self._budget = budget
+        self._proceed = False
+        self._root = None
+        self._low = 0.0
+        self._high = 0.0
+        self.evaluated = 0
+
+    def get_selected_block(self, board: Block) -> Optional[Block]:
+        """Return the block on <board> that is currently selected by the
+        MCTSPlayer.
+
+        If no block is selected, return None. Note that the MCTSPlayer never
+        selects any block.
+        """
+        return None
+
+    def process_event(self, event: pygame.event.Event) -> None:
+        """Communicates that the MCTSPlayer should make a move by setting
+        _proceed to True iff the user clicks their mouse.
+        """
+        from controls import is_click
+
+        if is_click(event):
+            self.request_move()
+
+    def request_move(self) -> None:
+        """Ask this MCTSPlayer to choose a move on its next call to
+        generate_move, by setting _proceed to True.
+        """
+        self._proceed = True
+
+    def generate_move(self, board: Block) -> \
+            Optional[Tuple[str, Optional[int], Block]]:
+        """Return the move with the most visits after searching the moves
+        from <board>, or PASS if no move is expected to improve this player's
+        score.
+
+        Each simulation performs its moves on <board> and reverts them, so
+        <board> is unchanged when this function returns.
+        """
+        if not self._proceed:
+            return None  # Do not remove
+        self._proceed = False  # Must set to False before returning!
+        deadline = None
+        if self._budget is not None:
+            deadline = time.perf_counter() + self._budget
+
+        root = self._find_root(board.structural_hash())
+        scorer = type(self.goal)(self.goal.colour)
+        scorer.track(board)
+        self._low = self._high = 0.0
+        self.evaluated = 0
+        now = time.perf_counter()
+        slowest = 0.0
+        while (self._budget is not None or
+               self.evaluated < self._iterations) and \
+                (deadline is None or now + slowest < deadline):
+            self._simulate(board, root, scorer)
+            self.evaluated += 1
+            finished = time.perf_counter()
+            slowest = max(slowest, finished - now)
+            now = finished
+
+        best = None
+        for move, child in root.children.items():
+            if best is None or child.visits > root.children[best].visits:
+                best = move
+        if best is not None:
+            child = root.children[best]
+            block = _get_block(board, best[0], best[1])
+            if child.total > 0 and block is not None:
+                self._root = child
+                return _create_move(best[2], block)
+        self._root = root
+        return _create_move(PASS, board)
+
+    def _find_root(self, board_hash: int) -> _SearchNode:
+        """Return the node of the kept search tree, at most _REROOT moves
+        below its root, whose board has the structural hash <board_hash>, or
+        a new node for that board if there is none.
+
+        Nodes nearer the root are preferred, since they have been visited
+        more.
+        """
+        level = [] if self._root is None else [self._root]
+        for _ in range(_REROOT + 1):
+            below = []
+            for node in level:
+                if node.board_hash == board_hash:
+                    return node
+                below.extend(node.children.values())
+            level = below
+        return _SearchNode(board_hash)
+
+    def _simulate(self, board: Block, root: _SearchNode, scorer: Goal) -> None:
+        """Run one simulation from <root>, which is at <board>, and update the
+        visits and rewards of the nodes it passes through.
+
+        The reward of a node is the best gain in score minus penalties that
+        was reached from its parent's board, from the move to it onwards.
+
+        <scorer> tracks <board>, and both are as they were when this method
+        returns.
+        """
+        colour = self.goal.colour
+        start = scorer.tracked_score()
+        log = []
+        moves = []
+        # The gain in score minus penalties after each move so far.
+        gains = [0]
+        penalty = 0
+        path = [root]
+        # The node of the board reached so far, or None once the simulation
+        # has left the tree and is making random moves.
+        node = root
+        rollout = _ROLLOUT
+        while True:
+            if node is not None and len(path) > _HORIZON:
+                node = None
+            if node is None:
+                if rollout == 0:
+                    break
+                rollout -= 1
+            if node is not None and node.children and \
+                    len(node.children) >= _WIDENING * math.sqrt(node.visits):
+                move = max(node.children, key=lambda m: self._uct(node, m))
+                block = _get_block(board, move[0], move[1])
+                action = move[2]
+                # A smash earlier in the simulation may have changed the
+                # blocks, so the move may no longer be possible.
+                if block is None or block.level != move[1] or \
+                        not block.perform(action, colour, log):
+                    break
+            else:
+                block = _get_random_block(self, board)
+                actions = _get_valid_actions(self, block)
+                if not actions:
+                    break
+                action = random.choice(actions)
+                move = (block.position, block.level, action)
+                block.perform(action, colour, log)
+            scorer.update_score(block, action)
+            moves.append((block, action))
+            penalty += ACTION_PENALTY[action]
+            gains.append(scorer.tracked_score() - start - penalty)
+
+            if node is not None:
+                child = node.children.get(move)
+                if child is None:
+                    child = _SearchNode(board.structural_hash())
+                    node.children[move] = child
+                    # The rest of the simulation is a random rollout.
+                    node = None
+                else:
+                    node = child
+                path.append(child)
+
+        while moves:
+            block, action = moves.pop()
+            undo_move(log)
+            scorer.update_score(block, action)
+
+        for depth, visited in enumerate(path):
+            # The root is rewarded like its children, from the first move.
+            first = max(depth, 1)
+            reward = 0
+            if len(gains) > first:
+                reward = max(gains[first:]) - gains[first - 1]
+            self._low = min(self._low, reward)
+            self._high = max(self._high, reward)
+            visited.visits += 1
+            visited.total += reward
+
+    def _uct(self, node: _SearchNode, move: _TreeMove) -> float:
+        """Return the UCT value of <move> from <node>: its average reward
+        scaled into [0, 1], plus a bonus for having been tried less often.
+        """
+        child = node.children[move]
+        if child.visits == 0:
+            return math.inf
+        span = self._high - self._low
+        value = 0.5
+        if span:
+            value = (child.total / child.visits - self._low) / span
+        return value + _EXPLORATION * math.sqrt(math.log(node.visits) /
+                                                child.visits)
+
+
+# The number of moves an AlphaBetaPlayer searches from each board below the
+# root, after ordering them.
+_WIDTH = 8
+
+
+class _Timeout(Exception):
+    """Raised when an AlphaBetaPlayer runs out of time in the middle of a
+    search.
+    """
+
+
+def _move_order(move: Tuple[Block, Tuple[str, Optional[int]]]) -> \
+        Tuple[int, int]:
+    """Return the key by which an AlphaBetaPlayer orders <move> before it has
+    scored it: moves without a penalty first, and then moves on larger blocks
+    first, since they change more of the board.
+    """
+    block, action = move
+    return ACTION_PENALTY[action], block.level
+
+
+class AlphaBetaPlayer(Player):
+    """A computer player that looks ahead at the moves of every player by
+    depth-limited minimax search with alpha-beta pruning.
+
+    A board is valued as this player's goal score minus its penalties, less
+    the best such net score among its opponents, and the opponents are
+    assumed to play against this player. Penalties are counted from the moves
+    in the search, as GameData.calculate_score counts them.
+
+    The search deepens one ply at a time. The first search scores every
+    move from the current board. Each deeper search tries only the <_width>
+    best of those moves, in the order of the previous search's values, and
+    from every other board tries PASS and the first <_width> moves in
+    _move_order.
+
+    === Public Attributes ===
+    evaluated:
+        The number of boards valued on this player's last turn.
+    depth_reached:
+        The depth of the deepest search completed on this player's last turn.
+
+    === Private Attributes ===
+    _proceed:
+        True when the player should make a move, False when the player should
+    wait.
+    _depth:
+        The number of plies to look ahead.
+    _players:
+        This player followed by the other players, in the order of their
+        turns.
+    _width:
+        The number of moves searched from each board below the root.
+    _budget:
+        The number of seconds this player may spend choosing each move, or
+        None if it always searches to <_depth>.
+    _deadline:
+        When the current search must stop, by time.perf_counter, or None.
+
+    == Representation Invariants concerning the private attributes ==
+        _depth >= 1
+        _width >= 1
+        _budget is None or _budget > 0
+    """
+    id: int
+    goal: Goal
+    evaluated: int
+    depth_reached: int
+    _proceed: bool
+    _depth: int
+    _players: List[Player]
+    _width: int
+    _budget: Optional[float]
+    _deadline: Optional[float]
+
+    def __init__(self, player_id: int, goal: Goal, depth: int,
+                 opponents: Sequence[Player] = (), width: int = _WIDTH,
+                 budget: Optional[float] = None) -> None:
+        """Initialize this AlphaBetaPlayer with the given <player_id> and
+        <goal>, to look ahead <depth> plies over the moves of this player and
+        <opponents>, searching <width> moves from each board below the root.
+
+        The search assumes that the players move in turn: this player, then
+        each of <opponents> in order, then this player again. So <opponents>
+        must be listed in the order they move after this player, as
+        set_opponents describes.
+
+        If <budget> is not None, the search stops deepening once <budget>
+        seconds have passed, and the move from the deepest completed search
+        is played.
+        """
+        Player.__init__(self, player_id, goal)
+        self._depth = depth
+        self._players = [self] + list(opponents)
+        self._width = width
+        self._budget = budget
+        self._deadline = None
+        self._proceed = False
+        self.evaluated = 0
+        self.depth_reached = 0
+
+    def set_opponents(self, opponents: Sequence[Player]) -> None:
+        """Look ahead over the moves of <opponents> from now on.
+
+        <opponents> must be listed in the order they move after this player.
+        In a game whose players take turns in the order of the list
+        <players>, with this player at index i, that is
+        players[i + 1:] + players[:i].
+        """
+        self._players = [self] + list(opponents)
+
+    def get_selected_block(self, board: Block) -> Optional[Block]:
+        """Return the block on <board> that is currently selected by the
+        AlphaBetaPlayer.
+
+        If no block is selected, return None. Note that the AlphaBetaPlayer
+        never selects any block.
+        """
+        return None
+
+    def process_event(self, event: pygame.event.Event) -> None:
+        """Communicates that the AlphaBetaPlayer should make a move by setting
+        _proceed to True iff the user clicks their mouse.
+        """
+        from controls import is_click
+
+        if is_click(event):
+            self.request_move()
+
+    def request_move(self) -> None:
+        """Ask this AlphaBetaPlayer to choose a move on its next call to
+        generate_move, by setting _proceed to True.
+        """
+        self._proceed = True
+
+    def generate_move(self, board: Block) -> \
+            Optional[Tuple[str, Optional[int], Block]]:
+        """Return the move with the best value found by searching ahead from
+        <board>, which may be PASS.
+
+        The moves searched are performed on <board> and reverted, so <board>
+        is unchanged when this function returns.
+        """
+        if not self._proceed:
+            return None  # Do not remove
+        self._proceed = False  # Must set to False before returning!
+        self._deadline = None
+        if self._budget is not None:
+            self._deadline = time.perf_counter() + self._budget
+        scorers = [type(player.goal)(player.goal.colour)
+                   for player in self._players]
+        for scorer in scorers:
+            scorer.track(board)
+        penalties = [0] * len(scorers)
+        self.evaluated = 0
+        self.depth_reached = 0
+
+        moves = [(board, PASS)] + sorted(_enumerate_moves(self, board),
+                                          key=_move_order)
+        best_block, best_action = board, PASS
+        for depth in range(1, self._depth + 1):
+            if depth > 1:
+                moves = moves[:self._width]
+            values = {}
+            alpha = -math.inf
+            try:
+                for block, action in moves:
+                    value = self._search_move(board, block, action, depth,
+                                              0, alpha, math.inf, scorers,
+                                              penalties)
+                    values[id(block), action] = value
+                    alpha = max(alpha, value)
+            except _Timeout:
+                # The first search is kept even if it was cut short, so that
+                # some move is always chosen.
+                if depth == 1 and values:
+                    moves = [move for move in moves
+                             if (id(move[0]), move[1]) in values]
+                    moves.sort(key=lambda m: -values[id(m[0]), m[1]])
+                    best_block, best_action = moves[0]
+                break
+            moves.sort(key=lambda m: -values[id(m[0]), m[1]])
+            best_block, best_action = moves[0]
+            self.depth_reached = depth
+        return _create_move(best_action, best_block)
+
+    def _search_move(self, board: Block, block: Block,
+                     action: Tuple[str, Optional[int]], depth: int, ply: int,
+                     alpha: float, beta: float, scorers: List[Goal],
+                     penalties: List[int]) -> float:
+        """Return the value of making <action> on <block> on <board>, with
+        <depth> plies left to search including this one.
+
+        <ply> is the number of plies since the root, which determines whose
+        move it is. <scorers> track <board> for each player in turn order, and
+        <penalties> are the penalties of their moves since the root. The
+        move is reverted, and <scorers> and <penalties> restored, before this
+        method returns or raises _Timeout.
+        """
+        if self._deadline is not None and \
+                time.perf_counter() >= self._deadline:
+            raise _Timeout
+        if action == PASS:
+            return self._search(board, depth - 1, ply + 1, alpha, beta,
+                                scorers, penalties)
+        mover = ply % len(scorers)
+        log = []
+        block.perform(action, self._players[mover].goal.colour, log)
+        for scorer in scorers:
+            scorer.update_score(block, action)
+        penalties[mover] += ACTION_PENALTY[action]
+        try:
+            return self._search(board, depth - 1, ply + 1, alpha, beta,
+                                scorers, penalties)
+        finally:
+            penalties[mover] -= ACTION_PENALTY[action]
+            undo_move(log)
+            for scorer in scorers:
+                scorer.update_score(block, action)
+
+    def _search(self, board: Block, depth: int, ply: int, alpha: float,
+                beta: float, scorers: List[Goal],
+                penalties: List[int]) -> float:
+        """Return the minimax value of <board> with <depth> plies left to
+        search, pruning any line whose value falls outside (alpha, beta).
+
+        The arguments are as for _search_move.
+        """
+        if depth == 0:
+            return self._evaluate(scorers, penalties)
+        mover = ply % len(scorers)
+        moves = [(board, PASS)] + heapq.nsmallest(
+            self._width, _enumerate_moves(self._players[mover], board),
+            key=_move_order)
+        if mover == 0:
+            value = -math.inf
+            for block, action in moves:
+                value = max(value, self._search_move(
+                    board, block, action, depth, ply, alpha, beta, scorers,
+                    penalties))
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
         else:
-            original_block = _get_block(board, best_block.position,
-                                        best_block.level)
-            return _create_move(best_move, original_block)
+            value = math.inf
+            for block, action in moves:
+                value = min(value, self._search_move(
+                    board, block, action, depth, ply, alpha, beta, scorers,
+                    penalties))
+                beta = min(beta, value)
+                if alpha >= beta:
+                    break
+        return value
+
+    def _evaluate(self, scorers: List[Goal], penalties: List[int]) -> float:
+        """Return the value of the board tracked by <scorers> for this
+        player, given the <penalties> of each player's moves since the root.
+        """
+        self.evaluated += 1
+        nets = [scorer.tracked_score() - penalty
+                for scorer, penalty in zip(scorers, penalties)]
+        if len(nets) == 1:
+            return nets[0]
+        return nets[0] - max(nets[1:])
 
 
 if __name__ == '__main__':
@@ -437,8 +1257,8 @@ if __name__ == '__main__':
         'allowed-io': ['process_event'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'actions', 'block',
-            'goal', 'pygame', '__future__'
+            'goal', 'pygame', '__future__', 'concurrent.futures', 'os',
+            'linear_board', 'math', 'time', 'heapq', 'controls'
         ],
-        'max-attributes': 10,
-        'generated-members': 'pygame.*'
+        'max-attributes': 10
     })
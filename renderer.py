@@ -21,18 +21,22 @@ Misha Schwartz, and Jaisie Sin.
 
 This file contains the class that "renders" the image of our game.
 """
-from typing import Dict, List, Tuple, Optional
+from collections import OrderedDict
+from typing import Dict, List, Set, Tuple, Optional
 import pygame
 
 from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, ACTION_KEY, ACTION_LABEL, COMBINE,\
-    PAINT, PASS
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, ACTION_LABEL, COMBINE, PAINT, PASS
+from controls import ACTION_KEY
 from settings import BACKGROUND_COLOUR, TEXT_COLOUR, OUTLINE_THICKNESS, \
     OUTLINE_COLOUR, HIGHLIGHT_THICKNESS, HIGHLIGHT_COLOUR, COLOUR_LIST, \
     colour_name
 
 Y_FONT_PADDING = 2
 
+# The most action images, scaled to the size of a block, that a Renderer keeps.
+MAX_SCALED_IMAGES = 64
+
 
 def _load_image(path_to_file: str) -> pygame.Surface:
     """
@@ -150,17 +154,57 @@ class Renderer:
     #   The font to use for text being drawn.
     # _images:
     #   A dictionary mapping actions to images that are displayed in the game.
+    # _scaled:
+    #   The images of actions already scaled to the size of a block, by action
+    #   and size, from least to most recently used. It holds at most
+    #   MAX_SCALED_IMAGES images.
     # _status_position:
     #   The (x, y) position of the status messages.
+    # _board:
+    #   The board as it was last drawn, without any highlights, images or
+    #   text drawn over it.
+    # _board_area:
+    #   The board area of the screen. Highlights, images and text are drawn
+    #   on it, so that they are clipped to the part of the screen that _board
+    #   restores.
+    # _squares:
+    #   The squares drawn on _board, or None if nothing has been drawn on it.
+    # _board_shown:
+    #   Whether the board area of the screen shows _board, apart from the
+    #   rectangles in _overlays.
+    # _overlays:
+    #   The rectangles of the board area that have been drawn over since
+    #   _board was last shown there.
+    # _cleared:
+    #   Whether the screen has been cleared since the board was last drawn.
+    #   The board area is only filled with BACKGROUND_COLOUR once something
+    #   other than the board is drawn there, so that a frame which draws the
+    #   board only needs to restore the parts of it that changed.
+    # _dirty:
+    #   The rectangles of the screen that have changed since the display was
+    #   last updated.
     _screen: pygame.Surface
     _instructions: pygame.Surface
     _images: Dict[Tuple[str, Optional[int]], pygame.Surface]
+    _scaled: OrderedDict
     _font: pygame.font.Font
     _status_position: Tuple[int, int]
-    _clear_rect: Tuple[Tuple[int, int], Tuple[int, int]]
-
-    def __init__(self, size: int) -> None:
+    _board_rect: pygame.Rect
+    _status_rect: pygame.Rect
+    _board: pygame.Surface
+    _board_area: pygame.Surface
+    _squares: Optional[Set[Tuple[Tuple[int, int, int], Tuple[int, int], int]]]
+    _board_shown: bool
+    _overlays: List[pygame.Rect]
+    _cleared: bool
+    _dirty: List[pygame.Rect]
+
+    def __init__(self, size: int, max_depth: Optional[int] = None) -> None:
         """Initialize this Renderer for a board with dimensions <size> x <size>.
+
+        If <max_depth> is not None, the image of every action is scaled in
+        advance to the size of the blocks at each level of a board with that
+        max_depth, so that drawing them never has to scale them.
         """
         self._font = pygame.font.Font(pygame.font.get_default_font(), 14)
         status_height = self._font.size("Player")[1]
@@ -174,7 +218,16 @@ class Renderer:
                                                  height)
 
         self._status_position = (10, size + Y_FONT_PADDING)
-        self._clear_rect = ((0, 0), (size, height))
+        self._board_rect = pygame.Rect(0, 0, size, size)
+        self._status_rect = pygame.Rect(0, size, size, height - size)
+
+        self._board = pygame.Surface((size, size))
+        self._board_area = self._screen.subsurface(self._board_rect)
+        self._squares = None
+        self._board_shown = False
+        self._overlays = []
+        self._cleared = True
+        self._dirty = [self._screen.get_rect()]
 
         self._images = {
             ROTATE_CLOCKWISE: _load_image('images/rotate-cw.png'),
@@ -186,11 +239,39 @@ class Renderer:
             PAINT: _load_image('images/paint.png'),
             PASS: _load_image('images/pass.png')
         }
+        self._scaled = OrderedDict()
+        if max_depth is not None:
+            for _ in range(max_depth + 1):
+                for action in self._images:
+                    self._scaled_image(action, size)
+                size = round(size / 2.0)
 
     def clear(self) -> None:
         """Clear the screen with BACKGROUND_COLOUR.
         """
-        self._screen.fill(BACKGROUND_COLOUR, self._clear_rect)
+        self._screen.fill(BACKGROUND_COLOUR, self._status_rect)
+        self._dirty.append(self._status_rect)
+        self._cleared = True
+
+    def _erase_board(self) -> None:
+        """Fill the board area of the screen with BACKGROUND_COLOUR, if the
+        screen was cleared and the board has not been drawn since.
+        """
+        if self._cleared:
+            self._screen.fill(BACKGROUND_COLOUR, self._board_rect)
+            self._dirty.append(self._board_rect)
+            self._board_shown = False
+            self._overlays = []
+            self._cleared = False
+
+    def _draw_over(self, rect: pygame.Rect) -> None:
+        """Record that the part of <rect> on the board area is about to be
+        drawn over.
+        """
+        self._erase_board()
+        rect = rect.clip(self._board_rect)
+        self._overlays.append(rect)
+        self._dirty.append(rect)
 
     def draw_image(self, action: Tuple[str, Optional[int]],
                    pos: Tuple[int, int], size: int) -> None:
@@ -200,25 +281,67 @@ class Renderer:
         If the action is not supported, no image is drawn.
         """
         if action in self._images:
-            image = self._images[action]
-            image = pygame.transform.scale(image, (size, size))
-            self._screen.blit(image, pos)
+            image = self._scaled_image(action, size)
+            self._draw_over(pygame.Rect(pos, (size, size)))
+            self._board_area.blit(image, pos)
+
+    def _scaled_image(self, action: Tuple[str, Optional[int]],
+                      size: int) -> pygame.Surface:
+        """Return the image of <action> scaled to <size> x <size>, scaling it
+        only if it is not already in _scaled.
+        """
+        key = (action, size)
+        image = self._scaled.get(key)
+        if image is None:
+            image = pygame.transform.scale(self._images[action], (size, size))
+            image = image.convert_alpha()
+            self._scaled[key] = image
+            if len(self._scaled) > MAX_SCALED_IMAGES:
+                self._scaled.popitem(last=False)
+        else:
+            self._scaled.move_to_end(key)
+        return image
 
     def draw_board(self, squares: List[Tuple[Tuple[int, int, int],
                                              Tuple[int, int], int]]) -> None:
         """Draw each block in blocks onto the screen.
+
+        Only the squares that were not in the board drawn last are drawn
+        again, and only the parts of the screen where the board has changed
+        or was drawn over are updated.
         """
-        for colour, pos, size in squares:
-            rect = (pos[0], pos[1], size, size)
-            pygame.draw.rect(self._screen, colour, rect, 0)
-            pygame.draw.rect(self._screen, OUTLINE_COLOUR, rect,
+        drawn = set(squares)
+        if self._squares is None:
+            changed = drawn
+        else:
+            changed = drawn - self._squares
+        self._squares = drawn
+
+        rects = []
+        for colour, pos, size in changed:
+            rect = pygame.Rect(pos, (size, size))
+            pygame.draw.rect(self._board, colour, rect, 0)
+            pygame.draw.rect(self._board, OUTLINE_COLOUR, rect,
                              OUTLINE_THICKNESS)
+            rects.append(rect)
+
+        if self._board_shown:
+            for rect in rects + self._overlays:
+                self._screen.blit(self._board, rect, rect)
+            self._dirty.extend(rects + self._overlays)
+        else:
+            self._screen.blit(self._board, self._board_rect)
+            self._dirty.append(self._board_rect)
+            self._board_shown = True
+        self._overlays = []
+        self._cleared = False
 
     def highlight_block(self, pos: Tuple[int, int], size: int) -> None:
         """Draw a highlighted square border at pos with size.
         """
         rect = (pos[0], pos[1], size, size)
-        pygame.draw.rect(self._screen, HIGHLIGHT_COLOUR, rect,
+        self._draw_over(pygame.Rect(rect))
+        pygame.draw.rect(self._board_area, HIGHLIGHT_COLOUR, rect,
                          HIGHLIGHT_THICKNESS)
 
     def text_height(self) -> int:
@@ -227,9 +350,11 @@ class Renderer:
         return self._font.size("Test")[1] + Y_FONT_PADDING
 
     def print(self, text: str, x: int, y: int) -> None:
-        """Print <text> to the (<x>, <y>) location on the screen.
+        """Print <text> to the (<x>, <y>) location on the board area of the
+        screen. Any part of <text> outside of the board area is not drawn.
         """
-        _print_to_image(text, x, y, self._font, self._screen)
+        self._draw_over(pygame.Rect((x, y), self._font.size(text)))
+        _print_to_image(text, x, y, self._font, self._board_area)
 
     def draw_status(self, message: str) -> None:
         """Draw the current status of the game.
@@ -237,7 +362,16 @@ class Renderer:
         surface = self._font.render(message, 1, TEXT_COLOUR)
         self._screen.blit(surface, self._status_position)
 
+    def update_display(self) -> None:
+        """Update the parts of the display that have changed since it was
+        last updated.
+        """
+        self._erase_board()
+        pygame.display.update(self._dirty)
+        self._dirty = []
+
     def save_to_file(self, filename: str) -> None:
         """Save the current graphics on the screen to a file named <filename>.
         """
+        self._erase_board()
         pygame.image.save(self._screen, filename)
@@ -76,3 +76,16 @@ def colour_name(colour: Tuple[int, int, int]) -> str:
         return colour_names[colour]
     else:
         return ''
+
+
+def colour_index(colour: Tuple[int, int, int]) -> int:
+    """Return the index of this colour value in COLOUR_LIST.
+
+    Precondition: colour in COLOUR_LIST
+
+    >>> colour_index(PACIFIC_POINT)
+    0
+    >>> colour_index(DAFFODIL_DELIGHT)
+    3
+    """
+    return COLOUR_LIST.index(colour)
@@ -0,0 +1,213 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a tournament runner for the Blocky game, which plays
+many headless games between every pairing of computer players across a pool
+of worker processes, and writes the result of each game to a file as soon
+as it finishes.
+
+Each computer player is described by a bot string: either the name of a kind
+of player, or that name followed by a colon and the strength of the player.
+The kinds are:
+    'random':    a RandomPlayer, which has no strength
+    'smart':     a SmartPlayer, whose strength is its difficulty
+    'mcts':      an MCTSPlayer, whose strength is its number of iterations
+    'alphabeta': an AlphaBetaPlayer, whose strength is its search depth
+For example, 'smart:5' is a SmartPlayer with a difficulty of 5.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import csv
+import json
+import random
+
+from block import generate_board
+from engine import HeadlessGame
+from goal import generate_goals
+from player import Player, RandomPlayer, SmartPlayer, MCTSPlayer, \
+    AlphaBetaPlayer
+from settings import BOARD_SIZE
+
+# The strength of each kind of player when its bot string does not give one.
+_DEFAULT_STRENGTH = {
+    'random': 0,
+    'smart': 5,
+    'mcts': 50,
+    'alphabeta': 2
+}
+
+# The columns of each result, in the order they are written to a CSV file.
+FIELDS = ['game', 'seed', 'seat', 'bot', 'goal', 'score', 'penalty',
+          'moves', 'seconds']
+
+# A single result of a tournament: one player's outcome in one game.
+Result = Dict[str, Union[int, float, str]]
+
+
+def create_bots(bots: Sequence[str]) -> List[Player]:
+    """Return a new list of players, one for each bot string in <bots>, in
+    order, each with a goal of a different colour.
+
+    The goals are chosen the same way as they are in create_players. Each
+    AlphaBetaPlayer looks ahead over the moves of every other player, in the
+    order they move after it.
+    """
+    goals = []
+    colours = []
+    for _ in bots:
+        goal = generate_goals(1)[0]
+        while goal.colour in colours:
+            goal = generate_goals(1)[0]
+        colours.append(goal.colour)
+        goals.append(goal)
+
+    players = []
+    for i, bot in enumerate(bots):
+        kind, strength = _parse_bot(bot)
+        if kind == 'random':
+            players.append(RandomPlayer(i, goals[i]))
+        elif kind == 'smart':
+            players.append(SmartPlayer(i, goals[i], strength))
+        elif kind == 'mcts':
+            players.append(MCTSPlayer(i, goals[i], strength))
+        else:
+            players.append(AlphaBetaPlayer(i, goals[i], strength))
+    for i, player in enumerate(players):
+        if isinstance(player, AlphaBetaPlayer):
+            player.set_opponents(players[i + 1:] + players[:i])
+    return players
+
+
+def _parse_bot(bot: str) -> Tuple[str, int]:
+    """Return the kind and strength of the player described by the bot
+    string <bot>.
+
+    Raise a ValueError if <bot> does not describe a kind of player.
+    """
+    kind, _, strength = bot.partition(':')
+    if kind not in _DEFAULT_STRENGTH:
+        raise ValueError(f'unknown kind of player: {bot!r}')
+    if strength == '':
+        return kind, _DEFAULT_STRENGTH[kind]
+    return kind, int(strength)
+
+
+def play_game(game: int, seed: int, bots: Sequence[str], max_depth: int,
+              num_turns: int) -> List[Result]:
+    """Play game number <game> of a tournament, between one player for each
+    bot string in <bots>, for <num_turns> turns on a random board with a
+    depth of <max_depth>, and return the result of each player.
+
+    The board, the goals and every random choice the players make are drawn
+    from the random module seeded by <seed>, so the same arguments always
+    give the same game.
+    """
+    random.seed(seed)
+    board = generate_board(max_depth, BOARD_SIZE)
+    players = create_bots(bots)
+    headless = HeadlessGame(board, players)
+
+    results = []
+    for player_id, score, penalty in headless.play(num_turns):
+        results.append({
+            'game': game,
+            'seed': seed,
+            'seat': player_id,
+            'bot': bots[player_id],
+            'goal': type(players[player_id].goal).__name__,
+            'score': score,
+            'penalty': penalty,
+            'moves': headless.moves[player_id],
+            'seconds': round(headless.seconds[player_id], 6)
+        })
+    return results
+
+
+def run_tournament(bots: Sequence[str], games: int, path: str,
+                   max_depth: int = 3, num_turns: int = 5,
+                   processes: Optional[int] = None,
+                   seed: int = 0) -> List[Result]:
+    """Play <games> games between each pair of bot strings in <bots> over
+    <processes> worker processes, or one for each CPU if <processes> is None,
+    and return the results of every game, in the order of their games.
+
+    Each game is played for <num_turns> turns on a random board with a depth
+    of <max_depth>. The two players of a pair take turns playing first. Game
+    number i is seeded by <seed> + i, so a tournament can be replayed
+    exactly, except for the time each player took.
+
+    The results of each game are written to the file at <path> as soon as
+    the game finishes: as rows of a CSV file if <path> ends in '.csv', or
+    as lines of JSON otherwise.
+
+    Precondition:
+        - len(bots) >= 2
+        - games >= 1
+    """
+    schedule = []
+    for first, second in combinations(bots, 2):
+        for i in range(games):
+            pairing = (first, second) if i % 2 == 0 else (second, first)
+            schedule.append(pairing)
+
+    results = []
+    with open(path, 'w', newline='') as file, \
+            ProcessPoolExecutor(processes) as executor:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(file, FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(result: Result) -> None:
+                file.write(json.dumps(result) + '\n')
+
+        futures = [executor.submit(play_game, i, seed + i, pairing,
+                                   max_depth, num_turns)
+                   for i, pairing in enumerate(schedule)]
+        for future in as_completed(futures):
+            for result in future.result():
+                write(result)
+                results.append(result)
+            file.flush()
+
+    results.sort(key=lambda result: (result['game'], result['seat']))
+    return results
+
+
+if __name__ == '__main__':
+    # import python_ta
+    # python_ta.check_all(config={
+    #     'allowed-io': ['run_tournament'],
+    #     'allowed-import-modules': [
+    #         'doctest', 'python_ta', 'random', 'typing', '__future__',
+    #         'concurrent.futures', 'itertools', 'csv', 'json',
+    #         'block', 'engine', 'goal', 'player', 'settings'
+    #     ]
+    # })
+
+    tournament = run_tournament(['random', 'smart:5', 'mcts:50',
+                                 'alphabeta:2'], 10, 'tournament.csv')
+    for name in ['random', 'smart:5', 'mcts:50', 'alphabeta:2']:
+        totals = [r['score'] - r['penalty'] for r in tournament
+                  if r['bot'] == name]
+        print(f'{name}: {sum(totals) / len(totals):.2f} points per game')